@@ -0,0 +1,98 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+
+# Directory for per-scan artifact bundles; unset disables recording
+ARTIFACTS_DIR = os.environ.get('SCAN_ARTIFACTS_DIR')
+
+BUNDLE_VERSION = 1
+
+
+def _har(network_sample):
+    # HAR 1.2 layout for the requests the network log kept verbatim
+    return {
+        'log': {
+            'version': '1.2',
+            'creator': {'name': 'redirect-detector', 'version': str(BUNDLE_VERSION)},
+            'entries': [{
+                'request': {'method': req['method'], 'url': req['url']},
+                '_resourceType': req['resourceType']
+            } for req in network_sample]
+        }
+    }
+
+
+def build_bundle(url, profile, report, capture):
+    """Everything rescore.py needs to score this scan again without the page.
+
+    ``capture`` holds what the report leaves out: the scanned HTML and script
+    text, the final document's headers, the DOM analysis (with links) and
+    the network sample.
+    """
+    security = report['security_scan']
+    return {
+        'version': BUNDLE_VERSION,
+        'url': url,
+        'scanned_at': time.time(),
+        'profile': profile,
+        'final_url': report['final_url'],
+        'redirect_chain': report['redirect_chain'],
+        'navigation': report['navigation'],
+        'headers': capture.get('headers') or {},
+        'html': capture.get('html', ''),
+        'scripts': capture.get('scripts', []),
+        'dom': capture.get('dom') or {
+            'iframes': report['hidden_iframes'],
+            'clickjacking': report['clickjacking_risks'],
+            'forms': report['form_risks'],
+            'links': [],
+            'storage': security.get('storage_usage', {})
+        },
+        'deep_links': report['deep_scan_results'],
+        'network_summary': report['network_summary'],
+        'har': _har(capture.get('network_sample', [])),
+        'verdict': {
+            'risk_score': security['risk_score'],
+            'verdict': security['verdict'],
+            'phishing_score': report['simple_analysis']['phishing_score'],
+            'phishing_verdict': report['simple_analysis']['phishing_verdict']
+        }
+    }
+
+
+def save_bundle(bundle, root=ARTIFACTS_DIR):
+    """Write ``bundle`` as gzipped JSON under ``root/YYYY-MM-DD/`` and return its path."""
+    day = time.strftime('%Y-%m-%d', time.gmtime(bundle['scanned_at']))
+    name = hashlib.sha1(bundle['url'].encode('utf-8')).hexdigest()[:16]
+    directory = os.path.join(root, day)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{int(bundle['scanned_at'] * 1000)}.json.gz")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(bundle, f)
+    os.replace(tmp, path)
+    return path
+
+
+def record_bundle(url, profile, report, capture):
+    try:
+        save_bundle(build_bundle(url, profile, report, capture))
+    except Exception as e:
+        # Recording is best effort; the scan result stands
+        logging.error(f"Artifact bundle error for {url}: {e}")
+
+
+def load_bundle(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_bundles(root):
+    """Paths of every bundle under ``root``, in a stable order."""
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            if name.endswith('.json.gz'):
+                yield os.path.join(directory, name)
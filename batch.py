@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import logging
+from concurrent.futures import wait, FIRST_COMPLETED
+from scan_engine import engine, SCAN_TIMEOUT
+from scan_cache import cache, cache_variant, normalize_url
+from scanner import analyze_url, prepare_url
+from resource_policy import SCAN_PROFILE
+from metrics import stage_timeouts
+
+# Scans a single batch keeps in flight (the engine's SCAN_CONCURRENCY still applies)
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', 20000))
+
+
+def parse_url_lines(lines):
+    """Read URLs from plain text or NDJSON lines (``"url"`` or ``{"url": ...}``)."""
+    urls = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line[0] in '{"':
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            line = item.get('url') if isinstance(item, dict) else item
+        if isinstance(line, str) and line:
+            urls.append(line)
+    return urls
+
+
+def dedupe_urls(urls):
+    """Prepare and dedupe ``urls`` on their normalized form, keeping order."""
+    seen = set()
+    unique = []
+    for url in urls:
+        try:
+            url = prepare_url(url)
+            key = normalize_url(url)
+        except ValueError:
+            # Kept as given so run_batch can report it
+            key = url = url.strip()
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+
+def run_batch(urls, concurrency=BATCH_CONCURRENCY, use_cache=True, profile=SCAN_PROFILE, skip=frozenset()):
+    """Scan ``urls`` and yield one record per unique URL as each finishes.
+
+    Records are ``{'url': ..., 'result': report}`` or ``{'url': ..., 'error': ...}``.
+    At most ``concurrency`` scans from this batch are queued on the engine at
+    once, so a huge list never floods the browser pool. Each scan gets
+    SCAN_TIMEOUT from submission, like ``/analyze``.
+    """
+    in_flight = {}
+    variant = cache_variant(profile, skip)
+
+    def finished(future):
+        url, _ = in_flight.pop(future)
+        try:
+            report = future.result()
+        except Exception as e:
+            logging.error(f"Batch scan error for {url}: {e}")
+            return {'url': url, 'error': str(e)}
+        cache.set(url, report, variant)
+        report['cache'] = {'status': 'miss', 'age': 0}
+        return {'url': url, 'result': report}
+
+    def settle():
+        # Records for scans that finished, or ran out of time, while we waited
+        timeout = max(0, min(deadline for _, deadline in in_flight.values()) - time.monotonic())
+        done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        records = [finished(future) for future in done]
+        now = time.monotonic()
+        for future, (url, deadline) in list(in_flight.items()):
+            if deadline <= now and not future.done():
+                future.cancel()
+                del in_flight[future]
+                stage_timeouts.inc('scan')
+                records.append({'url': url, 'error': 'Scan timed out'})
+        return records
+
+    try:
+        for url in dedupe_urls(urls):
+            try:
+                prepare_url(url)
+            except ValueError as e:
+                yield {'url': url, 'error': str(e)}
+                continue
+            if use_cache:
+                cached = cache.get(url, variant)
+                if cached:
+                    report, age = cached
+                    report['cache'] = {'status': 'hit', 'age': round(age, 1)}
+                    yield {'url': url, 'result': report}
+                    continue
+
+            future = engine.submit(analyze_url(url, profile=profile, skip=skip))
+            in_flight[future] = (url, time.monotonic() + SCAN_TIMEOUT)
+            while len(in_flight) >= concurrency:
+                yield from settle()
+
+        while in_flight:
+            yield from settle()
+    finally:
+        # Client went away mid-stream: stop the scans nobody will read
+        for future in in_flight:
+            future.cancel()
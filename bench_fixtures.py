@@ -0,0 +1,259 @@
+"""Local fixture site for benchmark.py: synthetic redirect and clickjacking scenarios.
+
+Serve it on its own for manual poking:
+    python bench_fixtures.py --port 8900
+"""
+import sys
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PAGE = '<!doctype html><html><head><title>{title}</title>{head}</head><body>{body}</body></html>'
+
+HUGE_DOM_NODES = 60000
+CHAIN_LENGTH = 8
+# benchmark.py adds this host to the server's trusted_hosts; 127.0.0.1 stays untrusted
+TRUSTED_HOST = 'localhost'
+
+
+def _page(title, body='', head=''):
+    return PAGE.format(title=title, head=head, body=body)
+
+
+def _landing():
+    return _page('Landing', '<h1>You made it</h1><a href="/benign">home</a>')
+
+
+def _benign():
+    links = ''.join(f'<a href="/landing?ref={i}">link {i}</a> ' for i in range(20))
+    return _page('Benign', f'<h1>Nothing to see</h1><p>{links}</p>')
+
+
+def _meta_refresh():
+    return _page('Meta refresh', 'Redirecting...', '<meta http-equiv="refresh" content="0; url=/landing">')
+
+
+def _js_redirect():
+    return _page('JS redirect', 'Please wait...<script>setTimeout(() => location.replace("/landing"), 300)</script>')
+
+
+def _open_redirect(target):
+    # Shaped like google.com/url?q=...: a 200 page that bounces the visitor on
+    return _page('Redirecting', f'<a href="{target}">Continue</a><script>location.replace({target!r})</script>',
+                 f'<meta http-equiv="refresh" content="0; url={target}">')
+
+
+def _hidden_iframe():
+    return _page('Hidden iframe', '<h1>Welcome</h1>'
+                 '<iframe src="/landing" style="opacity:0;width:1px;height:1px"></iframe>')
+
+
+def _overlay():
+    return _page('Overlay', '<button>Play video</button>'
+                 '<div style="position:fixed;top:0;left:0;width:100%;height:100%;z-index:9999;opacity:0"'
+                 ' onclick="location.href=\'/landing\'"></div>')
+
+
+def _external_form(port):
+    # localhost and 127.0.0.1 are different origins, so this posts "elsewhere" without leaving the host
+    return _page('Sign in', f'<form action="http://localhost:{port}/collect" method="post">'
+                 '<input name="user"><input name="pass" type="password"><button>Sign in</button></form>')
+
+
+def _phish(port):
+    return _page('Account suspended', '<h1>Urgent: action required</h1>'
+                 '<p>Your account will be suspended within 24 hours. Verify immediately.</p>'
+                 f'<form action="http://localhost:{port}/collect" method="post"><input name="card"></form>')
+
+
+def _huge_dom():
+    cells = '<div class="c"><span>cell</span></div>' * HUGE_DOM_NODES
+    return _page('Huge DOM', f'<h1>Catalogue</h1>{cells}')
+
+
+def _slow():
+    # One image that never finishes plus an endless long-poll loop: defeats networkidle
+    return _page('Slow', '<h1>Loading forever</h1><img src="/hang">'
+                 '<script>(function poll() { fetch("/poll").then(poll, poll); })();</script>')
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=()):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _redirect(self, location, status=302):
+        self._send(status, '', headers=[('Location', location)])
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._send(200, _page('Thanks', 'Received'))
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        port = self.server.server_address[1]
+
+        if path.startswith('/chain/'):
+            # /chain/N -> ... -> /chain/0 -> /landing, alternating 301/302/307/308
+            hops = int(path.rsplit('/', 1)[1] or 0)
+            target = f'/chain/{hops - 1}' if hops > 0 else '/landing'
+            self._redirect(target, (301, 302, 307, 308)[hops % 4])
+        elif path == '/open-redirect':
+            # Untrusted entry point, then the trusted host's redirector, then the phishing page
+            target = f'http://127.0.0.1:{port}/login/verify-account'
+            self._redirect(f'http://{TRUSTED_HOST}:{port}/url?q={target}', 302)
+        elif path == '/url':
+            self._send(200, _open_redirect(parse_qs(parts.query).get('q', ['/landing'])[0]))
+        elif path == '/download':
+            self._redirect('/files/report.pdf', 302)
+        elif path == '/files/report.pdf':
+            self._send(200, b'%PDF-1.4\n%fixture\n', 'application/pdf')
+        elif path == '/secure':
+            self._send(200, _benign(), headers=[
+                ('Strict-Transport-Security', 'max-age=31536000'),
+                ('Content-Security-Policy', "default-src 'self'"),
+                ('X-Frame-Options', 'DENY'),
+                ('X-Content-Type-Options', 'nosniff'),
+                ('Referrer-Policy', 'no-referrer')
+            ])
+        elif path == '/hang':
+            time.sleep(float(parse_qs(parts.query).get('s', ['30'])[0]))
+            self._send(200, b'', 'image/gif')
+        elif path == '/poll':
+            time.sleep(5)
+            self._send(200, b'{}', 'application/json')
+        else:
+            pages = {
+                '/landing': _landing,
+                '/benign': _benign,
+                '/meta-refresh': _meta_refresh,
+                '/js-redirect': _js_redirect,
+                '/hidden-iframe': _hidden_iframe,
+                '/overlay': _overlay,
+                '/external-form': lambda: _external_form(port),
+                '/login/verify-account': lambda: _phish(port),
+                '/malware': _benign,
+                '/huge-dom': _huge_dom,
+                '/slow': _slow,
+            }
+            if path in pages:
+                self._send(200, pages[path]())
+            else:
+                self._send(404, _page('Not found', 'Not found'))
+
+
+def _chain_statuses(report):
+    return [hop['status'] for hop in report['redirect_chain'][:-1]]
+
+
+def _final_path(report):
+    return urlsplit(report['final_url']).path
+
+
+# name -> (path, [(check description, predicate over the /analyze report)])
+SCENARIOS = {
+    'benign': ('/secure', [
+        ('no hidden iframes', lambda r: not r['hidden_iframes']),
+        ('no clickjacking', lambda r: not r['clickjacking_risks']),
+        ('no risky forms', lambda r: not r['form_risks']),
+        ('all security headers seen', lambda r: all(h['present'] for h in r['security_scan']['headers'].values())),
+    ]),
+    'redirect_chain': (f'/chain/{CHAIN_LENGTH}', [
+        ('lands on /landing', lambda r: _final_path(r) == '/landing'),
+        (f'{CHAIN_LENGTH + 1} server hops', lambda r: len(r['redirect_chain']) == CHAIN_LENGTH + 2),
+        ('real 3xx status per hop', lambda r: all(isinstance(s, int) and 300 <= s < 400 for s in _chain_statuses(r))),
+    ]),
+    'meta_refresh': ('/meta-refresh', [
+        ('lands on /landing', lambda r: _final_path(r) == '/landing'),
+        ('client navigation recorded', lambda r: len(r['redirect_chain']) > 1),
+    ]),
+    'js_redirect': ('/js-redirect', [
+        ('lands on /landing', lambda r: _final_path(r) == '/landing'),
+        ('client navigation recorded', lambda r: len(r['redirect_chain']) > 1),
+    ]),
+    'hidden_iframe': ('/hidden-iframe', [
+        ('hidden iframe found', lambda r: len(r['hidden_iframes']) >= 1),
+    ]),
+    'overlay': ('/overlay', [
+        ('transparent overlay found', lambda r: len(r['clickjacking_risks']) >= 1),
+        ('high risk verdict', lambda r: r['simple_analysis']['phishing_verdict'] != 'Low'),
+    ]),
+    'external_form': ('/external-form', [
+        ('external form found', lambda r: len(r['form_risks']) >= 1),
+    ]),
+    'phishing': ('/login/verify-account', [
+        ('URL keywords flagged', lambda r: any('suspicious words' in s for s in r['simple_analysis']['summary'])),
+        ('urgency raises the score', lambda r: r['simple_analysis']['phishing_score'] >= 60),
+    ]),
+    'trusted_open_redirect': ('/open-redirect', [
+        ('rendered despite the trusted host', lambda r: r['triage']['rendered']),
+        ('lands on the phishing page', lambda r: _final_path(r) == '/login/verify-account'),
+        ('URL keywords flagged', lambda r: any('suspicious words' in s for s in r['simple_analysis']['summary'])),
+    ]),
+    'blacklisted': ('/malware', [
+        ('threat intel hit', lambda r: r['security_scan']['threat_intel']['malicious']),
+    ]),
+    'download': ('/download', [
+        ('lands on the PDF', lambda r: _final_path(r) == '/files/report.pdf'),
+    ]),
+    'huge_dom': ('/huge-dom', [
+        ('no false overlays', lambda r: not r['clickjacking_risks']),
+        ('DOM budget reported', lambda r: 'elementsChecked' in r['dom_budget']),
+    ]),
+    'slow': ('/slow', [
+        ('navigation ended without network idle', lambda r: r['navigation'].get('condition') != 'networkidle'),
+    ]),
+}
+
+
+def blacklisted_urls(base_url, rounds=1):
+    """URLs the benchmark puts in its throwaway threat intel feed (batch runs add ``?round=N``)."""
+    url = base_url + SCENARIOS['blacklisted'][0]
+    return [url] + [f'{url}?round={i}' for i in range(rounds)]
+
+
+def start_fixture_server(host='127.0.0.1', port=0):
+    """Serve the fixtures from a daemon thread and return ``(server, base_url)``."""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the benchmark fixture site.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_fixture_server(args.host, args.port)
+    for name, (path, _) in SCENARIOS.items():
+        print(f'{name:16} {base_url}{path}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Offline throughput/latency benchmark with detection checks.
+
+Starts the fixture site (bench_fixtures.py), a throwaway threat intel index and,
+unless --target is given, a gunicorn server configured like production, then
+drives /analyze (or /analyze/batch with --batch) at the requested concurrency:
+
+    python benchmark.py -c 8 -r 5
+    python benchmark.py --batch --scenario overlay --scenario redirect_chain
+    python benchmark.py --target http://127.0.0.1:8080 --json results.json
+
+Exits non-zero when any detection check fails, so it can gate CI.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from bench_fixtures import SCENARIOS, TRUSTED_HOST, start_fixture_server, blacklisted_urls
+from threat_intel import build_index
+from patterns import RULES_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TIMEOUT = 60
+REQUEST_TIMEOUT = 200
+RSS_SAMPLE_INTERVAL = 0.25
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (``None`` when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+# --- Server under test ---
+
+def write_rules(workdir):
+    """Copy of the rules that also trusts the fixture site's TRUSTED_HOST."""
+    with open(RULES_PATH, encoding='utf-8') as f:
+        rules = json.load(f)
+    rules['trusted_hosts'] = rules.get('trusted_hosts', []) + [TRUSTED_HOST]
+    path = os.path.join(workdir, 'rules.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rules, f)
+    return path
+
+
+def _server_env(workdir, index_path, workers):
+    env = dict(os.environ)
+    env.update({
+        'WEB_CONCURRENCY': str(workers),
+        'THREAT_INTEL_INDEX': index_path,
+        'SCAN_RULES_PATH': write_rules(workdir),
+        'SCAN_JOBS_DB': os.path.join(workdir, 'jobs.db'),
+        'SCREENSHOT_DIR': os.path.join(workdir, 'screenshots'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'SCAN_HISTORY_DB': os.path.join(workdir, 'history.db'),
+        'SCAN_HISTORY_REUSE_MAX_AGE': '0',
+    })
+    # Every scan is measured from scratch
+    env.pop('SCAN_CACHE_PATH', None)
+    return env
+
+
+def start_server(port, workdir, index_path, workers):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-c', os.path.join(HERE, 'gunicorn.conf.py'),
+         '-b', f'127.0.0.1:{port}'],
+        cwd=HERE, env=_server_env(workdir, index_path, workers),
+        stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, 'server.log'), 'w')
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited early; see {workdir}/server.log')
+        try:
+            if requests.get(base_url + '/health', timeout=2).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('Server did not become healthy in time')
+
+
+class RSSSampler:
+    """Peak resident memory per gunicorn worker, browsers included (Linux /proc)."""
+
+    def __init__(self, master_pid):
+        self.master_pid = master_pid
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _processes():
+        parents, rss = {}, {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                # fields[1] is ppid, fields[21] is rss in pages
+                parents[int(entry)] = int(fields[1])
+                rss[int(entry)] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, IndexError, ValueError):
+                continue
+        return parents, rss
+
+    def sample(self):
+        parents, rss = self._processes()
+        children = {}
+        for pid, ppid in parents.items():
+            children.setdefault(ppid, []).append(pid)
+
+        def tree(pid):
+            return rss.get(pid, 0) + sum(tree(child) for child in children.get(pid, []))
+
+        for worker in children.get(self.master_pid, []):
+            self.peaks[worker] = max(self.peaks.get(worker, 0), tree(worker))
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.sample()
+
+    def __enter__(self):
+        if os.path.isdir('/proc'):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+
+# --- Load ---
+
+def _check(name, report):
+    return [(desc, bool(_safe(predicate, report))) for desc, predicate in SCENARIOS[name][1]]
+
+
+def _safe(predicate, report):
+    try:
+        return predicate(report)
+    except (KeyError, TypeError, IndexError):
+        return False
+
+
+def run_analyze(base_url, jobs, concurrency):
+    """POST each ``(scenario, url)`` to /analyze; returns one record per request."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def one(job):
+        name, url = job
+        started = time.monotonic()
+        try:
+            r = session.post(base_url + '/analyze', json={'url': url, 'no_cache': True}, timeout=REQUEST_TIMEOUT)
+            report = r.json()
+            error = report.get('error') if r.status_code != 200 else None
+        except (requests.RequestException, ValueError) as e:
+            report, error = None, str(e)
+        elapsed = time.monotonic() - started
+        return {'scenario': name, 'seconds': elapsed, 'error': error,
+                'checks': _check(name, report) if report and not error else []}
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(one, jobs))
+
+
+def run_batch(base_url, jobs):
+    """Send every URL in one /analyze/batch request; latency is time to each NDJSON line."""
+    by_url = {}
+    for name, url in jobs:
+        by_url.setdefault(url, name)
+    started = time.monotonic()
+    r = requests.post(base_url + '/analyze/batch?no_cache=1', data='\n'.join(url for _, url in jobs),
+                      headers={'Content-Type': 'text/plain'}, stream=True, timeout=REQUEST_TIMEOUT * len(jobs))
+    records = []
+    for line in r.iter_lines():
+        if not line:
+            continue
+        record = json.loads(line)
+        name = by_url.get(record['url'], '?')
+        error = record.get('error')
+        records.append({'scenario': name, 'seconds': time.monotonic() - started, 'error': error,
+                        'checks': _check(name, record['result']) if not error else []})
+    return records
+
+
+# --- Reporting ---
+
+def summarize(records, wall_seconds, rss_peaks):
+    latencies = [r['seconds'] for r in records if not r['error']]
+    scenarios = {}
+    for record in records:
+        s = scenarios.setdefault(record['scenario'], {'runs': 0, 'errors': 0, 'failed_checks': {}, 'seconds': []})
+        s['runs'] += 1
+        if record['error']:
+            s['errors'] += 1
+        else:
+            s['seconds'].append(record['seconds'])
+        failed = [f"error: {record['error'][:80]}"] if record['error'] else [d for d, ok in record['checks'] if not ok]
+        for desc in failed:
+            s['failed_checks'][desc] = s['failed_checks'].get(desc, 0) + 1
+
+    return {
+        'requests': len(records),
+        'errors': sum(1 for r in records if r['error']),
+        'wall_seconds': round(wall_seconds, 2),
+        'scans_per_second': round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        'latency_seconds': {f'p{p}': _round(percentile(latencies, p)) for p in (50, 95, 99)},
+        'peak_rss_mb': {str(pid): round(peak / 2**20, 1) for pid, peak in rss_peaks.items()},
+        'scenarios': {
+            name: {
+                'runs': s['runs'],
+                'errors': s['errors'],
+                'p50_seconds': _round(percentile(s['seconds'], 50)),
+                'passed': not s['failed_checks'],
+                'failed_checks': s['failed_checks']
+            } for name, s in sorted(scenarios.items())
+        }
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def print_summary(summary):
+    lat = summary['latency_seconds']
+    print(f"\n{summary['requests']} scans in {summary['wall_seconds']}s "
+          f"({summary['scans_per_second']} scans/s, {summary['errors']} errors)")
+    print(f"latency p50 {lat['p50']}s  p95 {lat['p95']}s  p99 {lat['p99']}s")
+    for pid, mb in summary['peak_rss_mb'].items():
+        print(f"worker {pid}: peak RSS {mb} MiB (browsers included)")
+    print(f"\n{'scenario':16} {'runs':>5} {'p50 s':>8}  detection")
+    for name, s in summary['scenarios'].items():
+        status = 'ok' if s['passed'] else 'FAIL ' + '; '.join(f'{d} (x{n})' for d, n in s['failed_checks'].items())
+        print(f"{name:16} {s['runs']:>5} {s['p50_seconds'] or '-':>8}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark scans against the local fixture site.')
+    parser.add_argument('--target', help='already running server (default: start gunicorn here)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='requests in flight (default 4)')
+    parser.add_argument('-r', '--rounds', type=int, default=3, help='scans per scenario (default 3)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='gunicorn workers when starting the server')
+    parser.add_argument('--port', type=int, default=8099, help='port for the started server')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='run only these scenarios (repeatable)')
+    parser.add_argument('--batch', action='store_true', help='drive /analyze/batch instead of /analyze')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='redirect_detector_bench_')
+    fixtures, fixture_url = start_fixture_server()
+    server = None
+    try:
+        feed = os.path.join(workdir, 'bench_feed.txt')
+        with open(feed, 'w') as f:
+            f.write('\n'.join(blacklisted_urls(fixture_url, args.rounds)) + '\n')
+        index_path = os.path.join(workdir, 'threat_intel.idx')
+        build_index([feed], index_path)
+
+        if args.target:
+            base_url = args.target.rstrip('/')
+            print('Note: blacklist checks and trusted hosts use the target server\'s own files')
+        else:
+            server, base_url = start_server(args.port, workdir, index_path, args.workers)
+
+        names = args.scenario or list(SCENARIOS)
+        jobs = [(name, fixture_url + SCENARIOS[name][0]) for _ in range(args.rounds) for name in names]
+        if args.batch:
+            # The batch path dedupes URLs, so make each round distinct
+            jobs = [(name, f"{url}{'&' if '?' in url else '?'}round={i // len(names)}")
+                    for i, (name, url) in enumerate(jobs)]
+
+        print(f"Running {len(jobs)} scans of {len(names)} scenarios against {base_url} "
+              f"({'batch' if args.batch else f'concurrency {args.concurrency}'})")
+        with RSSSampler(server.pid if server else -1) as sampler:
+            started = time.monotonic()
+            if args.batch:
+                records = run_batch(base_url, jobs)
+            else:
+                records = run_analyze(base_url, jobs, args.concurrency)
+            wall = time.monotonic() - started
+            sampler.sample()
+
+        summary = summarize(records, wall, sampler.peaks if server else {})
+        print_summary(summary)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2)
+        return 0 if all(s['passed'] for s in summary['scenarios'].values()) else 1
+    finally:
+        fixtures.shutdown()
+        if server:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
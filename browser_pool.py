@@ -0,0 +1,171 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+# Pool tuning (per gunicorn worker process)
+POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 1))
+MAX_SCANS_PER_BROWSER = int(os.environ.get('BROWSER_MAX_SCANS', 200))
+
+LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox']
+
+# Context that mimics a real user
+CONTEXT_OPTIONS = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'viewport': {'width': 1280, 'height': 720},
+    'ignore_https_errors': True
+}
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.scans = 0
+        self.active = 0
+        self.crashed = False
+        browser.on('disconnected', self._on_disconnected)
+
+    def _on_disconnected(self, _browser):
+        self.crashed = True
+
+    def healthy(self):
+        return not self.crashed and self.browser.is_connected()
+
+    async def close(self):
+        try:
+            await self.browser.close()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """Long-lived Chromium instances shared by every scan in this process.
+
+    Browsers are launched once and reused; each scan only pays for a fresh,
+    isolated context on the least busy browser. A browser is retired after
+    ``max_scans`` scans or as soon as it fails a health check, and closed
+    once its in-flight scans have drained. Replacements are launched in the
+    background; :meth:`warm` fills the pool before the first scan.
+
+    All methods must be called from the scan engine's event loop.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_scans=MAX_SCANS_PER_BROWSER):
+        self.size = max(1, size)
+        self.max_scans = max(1, max_scans)
+        self._playwright = None
+        self._browsers = []
+        self._launches = set()
+        self._lock = None
+
+    async def _launch(self):
+        browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        return _PooledBrowser(browser)
+
+    async def _add_browser(self):
+        try:
+            self._browsers.append(await self._launch())
+        except Exception as e:
+            logging.error(f"Browser launch error: {e}")
+
+    def _usable(self, pooled):
+        return pooled.healthy() and pooled.scans < self.max_scans
+
+    def _replace(self):
+        # Launch browsers up to size in the background, so no scan waits on a launch
+        missing = self.size - sum(1 for b in self._browsers if self._usable(b)) - len(self._launches)
+        for _ in range(missing):
+            task = asyncio.ensure_future(self._add_browser())
+            self._launches.add(task)
+            task.add_done_callback(self._launches.discard)
+
+    async def _start(self):
+        # Caller holds the lock
+        if self._playwright is None:
+            logging.info(f"Starting browser pool (size={self.size})")
+            self._playwright = await async_playwright().start()
+
+    async def warm(self):
+        """Start launching the pool's browsers ahead of the first scan."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._start()
+            self._replace()
+
+    async def _checkout(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._start()
+            # Health check: retire crashed or exhausted browsers
+            for pooled in list(self._browsers):
+                if not self._usable(pooled):
+                    logging.info(f"Retiring browser after {pooled.scans} scans")
+                    self._browsers.remove(pooled)
+                    if pooled.active == 0:
+                        await pooled.close()
+
+            self._replace()
+            if not self._browsers:
+                # Cold pool, or every browser retired at once: wait for the first launch
+                await asyncio.wait(set(self._launches), return_when=asyncio.FIRST_COMPLETED)
+                if not self._browsers:
+                    raise RuntimeError('No browser could be launched')
+
+            pooled = min(self._browsers, key=lambda b: b.active)
+            pooled.active += 1
+            pooled.scans += 1
+            if pooled.scans >= self.max_scans:
+                # Its last scan: have the replacement up by the next checkout
+                self._replace()
+            return pooled
+
+    async def _checkin(self, pooled):
+        pooled.active -= 1
+        if pooled.active == 0 and pooled not in self._browsers:
+            await pooled.close()
+
+    @asynccontextmanager
+    async def context(self, **overrides):
+        """Yield a fresh browser context from a pooled browser."""
+        pooled = await self._checkout()
+        context = None
+        try:
+            try:
+                context = await pooled.browser.new_context(**{**CONTEXT_OPTIONS, **overrides})
+            except Exception:
+                pooled.crashed = True
+                raise
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pooled.crashed = True
+            await self._checkin(pooled)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'browsers': len(self._browsers),
+            'healthy': sum(1 for b in self._browsers if b.healthy()),
+            'active_contexts': sum(b.active for b in self._browsers),
+            'launching': len(self._launches),
+            'max_scans_per_browser': self.max_scans
+        }
+
+    async def shutdown(self):
+        for task in list(self._launches):
+            task.cancel()
+        for pooled in self._browsers:
+            await pooled.close()
+        self._browsers = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = None
+
+
+pool = BrowserPool()
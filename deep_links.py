@@ -0,0 +1,118 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http_client import new_session
+from metrics import stage_timeouts
+
+# Deep link scan tuning
+DEEP_LINK_LIMIT = int(os.environ.get('DEEP_LINK_LIMIT', 50))
+DEEP_LINK_CONCURRENCY = int(os.environ.get('DEEP_LINK_CONCURRENCY', 8))
+DEEP_LINK_DEADLINE = float(os.environ.get('DEEP_LINK_DEADLINE', 20))
+# 'http' (no rendering), 'browser' (render every link) or 'auto'
+DEEP_LINK_MODE = os.environ.get('DEEP_LINK_MODE', 'auto')
+# In 'auto' mode, HTML targets are re-checked in the browser up to this many times
+DEEP_LINK_BROWSER_MAX = int(os.environ.get('DEEP_LINK_BROWSER_MAX', 5))
+# Threads for HTTP probes, shared by every scan in the worker
+DEEP_LINK_THREADS = int(os.environ.get('DEEP_LINK_THREADS', 16))
+DEEP_LINK_MAX_REDIRECTS = int(os.environ.get('DEEP_LINK_MAX_REDIRECTS', 10))
+
+HTTP_TIMEOUT = 5
+BROWSER_TIMEOUT = 15000
+
+# Probes block on the network and outlive their cancelled tasks; their own pool
+# keeps them from starving the loop's default executor (triage, history, DNS...)
+probe_pool = ThreadPoolExecutor(max_workers=max(1, DEEP_LINK_THREADS), thread_name_prefix='deep-link')
+probe_session = new_session(max_redirects=DEEP_LINK_MAX_REDIRECTS)
+
+
+def _result(link_url, link_text, final_url, probe):
+    is_redirect = (link_url != final_url) and (link_url + '/' != final_url)
+    return {
+        'original_text': link_text,
+        'original_url': link_url,
+        'final_url': final_url,
+        'redirected': is_redirect,
+        'probe': probe
+    }
+
+
+def _error(link_url, link_text, message):
+    return {
+        'original_text': link_text,
+        'original_url': link_url,
+        'error': message
+    }
+
+
+def _http_follow(link_url):
+    """Follow server-side redirects without rendering (blocking).
+
+    Returns ``(final_url, is_html)``.
+    """
+    r = probe_session.head(link_url, allow_redirects=True, timeout=HTTP_TIMEOUT, verify=False)
+    if r.status_code in (403, 405, 501):
+        # Some servers reject HEAD; fall back to a streamed GET without reading the body
+        r = probe_session.get(link_url, allow_redirects=True, timeout=HTTP_TIMEOUT, verify=False, stream=True)
+        r.close()
+    return r.url, 'html' in r.headers.get('content-type', '')
+
+
+async def _browser_follow(context, link_url):
+    sub_page = await context.new_page()
+    try:
+        await sub_page.goto(link_url, wait_until='domcontentloaded', timeout=BROWSER_TIMEOUT)
+        return sub_page.url
+    finally:
+        await sub_page.close()
+
+
+async def scan_deep_links(context, links, mode=DEEP_LINK_MODE, limit=DEEP_LINK_LIMIT,
+                          concurrency=DEEP_LINK_CONCURRENCY, deadline=DEEP_LINK_DEADLINE):
+    """Probe where the page's outgoing links really lead.
+
+    ``links`` is the DOM analysis link list. Probes run concurrently, at most
+    ``concurrency`` at a time, and anything still pending after ``deadline``
+    seconds is reported as timed out. Results keep the order of ``links``.
+    """
+    unique_links = {l['href']: l['text'] for l in links}
+    target_links = list(unique_links.items())[:limit]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    browser_budget = [DEEP_LINK_BROWSER_MAX]
+
+    async def probe(link_url, link_text):
+        async with semaphore:
+            try:
+                if mode == 'browser':
+                    final_url = await _browser_follow(context, link_url)
+                    return _result(link_url, link_text, final_url, 'browser')
+
+                loop = asyncio.get_running_loop()
+                final_url, is_html = await loop.run_in_executor(probe_pool, _http_follow, link_url)
+                # HTML can still carry JS redirects; render a few of them
+                if mode == 'auto' and is_html and browser_budget[0] > 0:
+                    browser_budget[0] -= 1
+                    final_url = await _browser_follow(context, link_url)
+                    return _result(link_url, link_text, final_url, 'browser')
+                return _result(link_url, link_text, final_url, 'http')
+            except Exception:
+                return _error(link_url, link_text, "Connection Failed/Timeout")
+
+    tasks = [asyncio.ensure_future(probe(u, t)) for u, t in target_links]
+    if not tasks:
+        return []
+
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    if pending:
+        logging.info(f"Deep link scan deadline hit, {len(pending)} probes cancelled")
+        stage_timeouts.inc('deep_links', amount=len(pending))
+        for task in pending:
+            task.cancel()
+
+    deep_link_results = []
+    for task, (link_url, link_text) in zip(tasks, target_links):
+        if task in pending:
+            deep_link_results.append(_error(link_url, link_text, "Deadline exceeded"))
+        else:
+            deep_link_results.append(task.result())
+    return deep_link_results
@@ -0,0 +1,238 @@
+import os
+import asyncio
+import logging
+from metrics import stage_errors
+
+# Per-frame evaluate budget
+DOM_TIME_BUDGET_MS = int(os.environ.get('DOM_TIME_BUDGET_MS', 1500))
+DOM_ELEMENT_BUDGET = int(os.environ.get('DOM_ELEMENT_BUDGET', 5000))
+DOM_MAX_LINKS = int(os.environ.get('DOM_MAX_LINKS', 200))
+# Child frames analyzed alongside the top document
+DOM_MAX_FRAMES = int(os.environ.get('DOM_MAX_FRAMES', 10))
+
+
+DOM_SCRIPT = '''(budget) => {
+    const started = performance.now();
+    const hidden_iframes = [];
+    const risky_click_elements = [];
+    const risky_forms = [];
+    let checked = 0;
+    let budgetHit = false;
+
+    const overBudget = () => {
+        if (checked >= budget.maxElements || performance.now() - started > budget.timeMs) {
+            budgetHit = true;
+        }
+        return budgetHit;
+    };
+
+    // Storage Analysis (throws in sandboxed/opaque frames)
+    let storageUsage = {};
+    try {
+        storageUsage = {
+            localStorageEntries: Object.keys(localStorage).length,
+            sessionStorageEntries: Object.keys(sessionStorage).length,
+            cookiesCount: document.cookie.split(';').filter(c => c.trim()).length
+        };
+    } catch (e) {}
+
+    // Iframe Analysis
+    for (const iframe of document.querySelectorAll('iframe')) {
+        if (overBudget()) break;
+        checked++;
+        const style = window.getComputedStyle(iframe);
+        const rect = iframe.getBoundingClientRect();
+        let risk = [];
+
+        // Check for hidden or tiny iframes
+        if (style.opacity === '0') risk.push('Opacity 0');
+        if (style.visibility === 'hidden') risk.push('Hidden Visibility');
+        if (style.display === 'none') risk.push('Display None');
+        if (rect.width < 5 || rect.height < 5) risk.push('Tiny dimensions');
+        if (rect.left < -100 || rect.top < -100) risk.push('Positioned Off-screen');
+
+        if (risk.length > 0) {
+            hidden_iframes.push({
+                src: iframe.src || 'about:blank',
+                risks: risk
+            });
+        }
+    }
+
+    // Clickjacking / Overlay Analysis
+    const OVERLAY_TAGS = new Set(['DIV', 'SPAN', 'A', 'BUTTON', 'IMG']);
+    const seen = new Set();
+    const checkOverlay = el => {
+        if (seen.has(el) || !OVERLAY_TAGS.has(el.tagName)) return;
+        seen.add(el);
+        checked++;
+        const style = window.getComputedStyle(el);
+        const zIndex = parseInt(style.zIndex, 10);
+
+        // High Z-Index elements
+        if (!isNaN(zIndex) && zIndex > 50) {
+            const rect = el.getBoundingClientRect();
+            const opacity = parseFloat(style.opacity);
+
+            // Large area, clickable, but invisible/transparent
+            if (rect.width > 50 && rect.height > 50 && style.pointerEvents !== 'none') {
+                if (opacity < 0.1 || (style.backgroundColor.includes('rgba') && style.backgroundColor.includes(', 0)'))) {
+                    risky_click_elements.push({
+                        tag: el.tagName,
+                        zIndex: zIndex,
+                        message: "Invisible high z-index overlay detected"
+                    });
+                }
+            }
+        }
+    };
+
+    // Cheap prefilter first: whatever sits on top of a grid of viewport points
+    // (an overlay has to, to steal clicks), then anything given a z-index
+    // inline or by a readable stylesheet rule. Collected one by one up to the
+    // budget: spreading a page-sized NodeList overflows the call stack.
+    const candidates = [];
+    const candidatesFull = () => candidates.length >= budget.maxElements || overBudget();
+    const addCandidates = nodes => {
+        for (const el of nodes) {
+            if (candidatesFull()) return;
+            candidates.push(el);
+        }
+    };
+    const w = window.innerWidth, h = window.innerHeight;
+    for (let gx = 1; gx < 6; gx++) {
+        for (let gy = 1; gy < 6; gy++) {
+            addCandidates(document.elementsFromPoint(w * gx / 6, h * gy / 6).slice(0, 3));
+        }
+    }
+    addCandidates(document.querySelectorAll('[style*="z-index" i]'));
+    for (const sheet of document.styleSheets) {
+        if (candidatesFull()) break;
+        let rules;
+        try { rules = sheet.cssRules; } catch (e) { continue; }  // cross-origin sheet
+        for (const rule of rules || []) {
+            if (candidatesFull()) break;
+            if (rule.style && rule.style.zIndex && rule.selectorText) {
+                let matched;
+                try { matched = document.querySelectorAll(rule.selectorText); } catch (e) { continue; }
+                addCandidates(matched);
+            }
+        }
+    }
+    for (const el of candidates) {
+        if (overBudget()) break;
+        checkOverlay(el);
+    }
+
+    // Then the full sweep, for as long as the budget allows
+    if (!budgetHit) {
+        for (const el of document.querySelectorAll('div, span, a, button, img')) {
+            if (overBudget()) break;
+            checkOverlay(el);
+        }
+    }
+
+    // Form Analysis
+    for (const form of document.forms) {
+        const action = form.action;
+        if (action && !action.startsWith(window.location.origin) && action.startsWith('http')) {
+            risky_forms.push({
+                action: action,
+                method: form.method || 'GET',
+                warning: "Submits data to external domain"
+            });
+        }
+    }
+
+    // Links: deduplicated and capped here so huge pages never ship them all
+    const links = [];
+    const hrefs = new Set();
+    let totalLinks = 0;
+    let linksTruncated = false;
+    for (const a of document.links) {
+        const href = a.href;
+        if (!href.startsWith('http')) continue;
+        totalLinks++;
+        if (hrefs.has(href)) continue;
+        if (links.length >= budget.maxLinks) {
+            // A distinct link past the cap; repeats of kept ones don't count
+            linksTruncated = true;
+            continue;
+        }
+        hrefs.add(href);
+        links.push({
+            text: (a.textContent || '').trim().slice(0, 50) || 'Image/Icon',
+            href: href
+        });
+    }
+
+    return {
+        iframes: hidden_iframes,
+        clickjacking: risky_click_elements,
+        forms: risky_forms,
+        links: links,
+        storage: storageUsage,
+        budget: {
+            elementsChecked: checked,
+            budgetHit: budgetHit,
+            linksFound: totalLinks,
+            linksTruncated: linksTruncated,
+            elapsedMs: Math.round(performance.now() - started)
+        }
+    };
+}'''
+
+
+def empty_analysis():
+    return {'iframes': [], 'clickjacking': [], 'forms': [], 'links': [], 'storage': {}}
+
+
+def failed_analysis(error):
+    # A page that breaks the analyzer is not a clean page; scoring penalizes this
+    return {**empty_analysis(), 'budget': {'analysisFailed': True, 'error': str(error)[:200]}}
+
+
+async def _evaluate(frame, budget):
+    # Hard stop in case the page's main thread is stuck
+    return await asyncio.wait_for(frame.evaluate(DOM_SCRIPT, budget), budget['timeMs'] / 1000 + 5)
+
+
+async def analyze_dom(page):
+    """Bounded iframe/overlay/form/link analysis of the page and its child frames.
+
+    Child frames run concurrently with the top document; their findings are
+    merged with a ``frame`` field naming the frame URL. Links come from the
+    top document only.
+    """
+    budget = {'timeMs': DOM_TIME_BUDGET_MS, 'maxElements': DOM_ELEMENT_BUDGET, 'maxLinks': DOM_MAX_LINKS}
+    child_frames = [f for f in page.frames if f != page.main_frame and not f.is_detached()]
+    frames = child_frames[:DOM_MAX_FRAMES]
+
+    results = await asyncio.gather(
+        _evaluate(page.main_frame, budget),
+        *(_evaluate(frame, budget) for frame in frames),
+        return_exceptions=True
+    )
+
+    top = results[0]
+    if isinstance(top, BaseException):
+        logging.error(f"DOM analysis failed for the top document: {top}")
+        stage_errors.inc('dom')
+        top = failed_analysis(top)
+        top['budget'].update(elementsChecked=0, budgetHit=False)
+    dom_analysis = {key: top[key] for key in empty_analysis()}
+    budget_report = {**top['budget'], 'framesAnalyzed': 0, 'framesSkipped': len(child_frames) - len(frames)}
+
+    for frame, result in zip(frames, results[1:]):
+        if isinstance(result, BaseException):
+            logging.debug(f"Frame analysis failed for {frame.url}: {result}")
+            budget_report['framesSkipped'] += 1
+            continue
+        budget_report['framesAnalyzed'] += 1
+        budget_report['elementsChecked'] += result['budget']['elementsChecked']
+        budget_report['budgetHit'] = budget_report['budgetHit'] or result['budget']['budgetHit']
+        for key in ('iframes', 'clickjacking', 'forms'):
+            dom_analysis[key] += [{**item, 'frame': frame.url} for item in result[key]]
+
+    dom_analysis['budget'] = budget_report
+    return dom_analysis
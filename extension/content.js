@@ -1,7 +1,38 @@
 // Invisible Redirect Protector - Content Script
 
-const API_URL = "https://invisible-redirect-detector.onrender.com/analyze";
-// Note: User can change this to http://localhost:8080/analyze for local testing
+const API_URL = "https://invisible-redirect-detector.onrender.com/verdict";
+// Note: User can change this to http://localhost:8080/verdict for local testing
+
+// Host-level hints from the server ("allow"/"block"), cached until they expire
+const HINT_PREFIX = 'ir-hint:';
+
+function hostScopes(hostname) {
+    // www.a.example.com -> [www.a.example.com, a.example.com, example.com]
+    const labels = hostname.split('.');
+    const scopes = [];
+    for (let i = 0; i < labels.length - 1; i++) scopes.push(labels.slice(i).join('.'));
+    return scopes;
+}
+
+async function cachedHint(hostname) {
+    const keys = hostScopes(hostname).map(scope => HINT_PREFIX + scope);
+    const stored = await chrome.storage.local.get(keys);
+    for (const key of keys) {
+        const entry = stored[key];
+        if (!entry || entry.expires <= Date.now()) continue;
+        // A blacklisted domain covers its subdomains; trust is for the exact host only
+        if (entry.hint.verdict === 'allow' && entry.hint.scope !== hostname) continue;
+        return entry.hint;
+    }
+    return null;
+}
+
+function rememberHint(hint) {
+    if (!hint) return;
+    chrome.storage.local.set({
+        [HINT_PREFIX + hint.scope]: { hint: hint, expires: Date.now() + hint.max_age * 1000 }
+    });
+}
 
 // logic to inject the badge
 function createBadge() {
@@ -43,18 +74,26 @@ async function analyzePage() {
     const summaryList = document.getElementById('ir-summary');
 
     try {
-        const response = await fetch(API_URL, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ url: currentUrl })
-        });
-
-        const data = await response.json();
+        let data;
+        const hint = await cachedHint(window.location.hostname);
+        if (hint && hint.verdict === 'allow') {
+            data = { risk_score: 100, phishing_verdict: 'Low', reasons: ['✅ Trusted site.'] };
+        } else if (hint && hint.verdict === 'block') {
+            data = { risk_score: 0, phishing_verdict: 'High', reasons: [`⛔ CRITICAL: ${hint.scope} is blacklisted.`] };
+        } else {
+            // GET so the browser's HTTP cache (ETag / max-age) absorbs repeat visits
+            const response = await fetch(`${API_URL}?url=${encodeURIComponent(currentUrl)}`);
+            data = await response.json();
+            // Never trust a host on the strength of a verdict that found it listed
+            if (!(data.malicious && data.host_hint && data.host_hint.verdict === 'allow')) {
+                rememberHint(data.host_hint);
+            }
+        }
 
         // Update UI based on Risk
-        const score = data.security_scan ? data.security_scan.risk_score : 100;
-        const simpleSummary = data.simple_analysis ? data.simple_analysis.summary : [];
-        const isPhishing = data.simple_analysis && data.simple_analysis.phishing_verdict === 'High';
+        const score = typeof data.risk_score === 'number' ? data.risk_score : 100;
+        const simpleSummary = data.reasons || [];
+        const isPhishing = data.phishing_verdict === 'High';
 
         shield.classList.remove('logging');
 
@@ -0,0 +1,25 @@
+import os
+
+# Picked up automatically by `gunicorn app:app` (Procfile, Dockerfile, render.yaml).
+# Request threads only wait on the per-worker async scan engine, so a few
+# processes with many threads each serve many concurrent scans. The defaults
+# fit a small (512 MB) instance; raise WEB_CONCURRENCY, BROWSER_POOL_SIZE and
+# SCAN_CONCURRENCY together on bigger machines.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 180))
+
+
+def worker_exit(server, worker):
+    # Close this worker's warm browsers instead of leaving them to the OS
+    from scan_engine import engine
+    from browser_pool import pool
+    engine.shutdown(pool.shutdown)
+
+
+def post_worker_init(worker):
+    # Launch this worker's browsers now rather than on its first scan
+    from scan_engine import engine
+    from browser_pool import pool
+    engine.submit(pool.warm())
@@ -0,0 +1,22 @@
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Outbound probes mirror the browser context's ignore_https_errors
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def new_session(max_redirects=requests.models.DEFAULT_REDIRECT_LIMIT):
+    """Keep-alive session with the scanner's User-Agent."""
+    s = requests.Session()
+    s.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+    s.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+    s.headers['User-Agent'] = USER_AGENT
+    s.max_redirects = max_redirects
+    return s
+
+
+# One keep-alive session shared by every outbound HTTP call in this process
+session = new_session()
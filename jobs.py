@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scan_engine import engine
+from scan_cache import cache, cache_variant
+from scanner import analyze_url, ScanError
+from resource_policy import SCAN_PROFILE
+
+# SQLite file shared by every gunicorn worker, so any worker can answer a poll
+JOBS_DB = os.environ.get('SCAN_JOBS_DB', os.path.join(tempfile.gettempdir(), 'redirect_detector_jobs.db'))
+# Finished jobs are purged after this many seconds
+JOB_RETENTION = int(os.environ.get('SCAN_JOB_RETENTION', 3600))
+
+
+class JobStore:
+    """Scan jobs and their progress, persisted in SQLite."""
+
+    def __init__(self, path=JOBS_DB):
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS scan_jobs (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result TEXT,
+                error TEXT
+            )''')
+            self._db.commit()
+
+    def create(self, url):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute('DELETE FROM scan_jobs WHERE updated_at < ?', (now - JOB_RETENTION,))
+            self._db.execute('INSERT INTO scan_jobs (id, url, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                             (job_id, url, 'queued', now, now))
+            self._db.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f'UPDATE scan_jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT * FROM scan_jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {k: row[k] for k in row.keys() if row[k] is not None}
+        if 'result' in job:
+            job['result'] = json.loads(job['result'])
+        return job
+
+
+store = JobStore()
+
+# Job writes from scans go through one thread: off the engine's event loop
+# (SQLite may wait on other workers' locks) and still applied in order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-writer')
+
+
+def _update(job_id, fields):
+    try:
+        store.update(job_id, **fields)
+    except sqlite3.Error as e:
+        logging.error(f"Job store write error for {job_id}: {e}")
+
+
+def _write(job_id, **fields):
+    """Queue a job update and return its future (awaitable via asyncio.wrap_future)."""
+    return _writer.submit(_update, job_id, fields)
+
+
+async def _run_job(job_id, url, profile, skip):
+    def progress(stage):
+        _write(job_id, stage=stage)
+
+    await asyncio.wrap_future(_write(job_id, status='running'))
+    try:
+        report = await analyze_url(url, progress=progress, profile=profile, skip=skip)
+    except asyncio.CancelledError:
+        _write(job_id, status='failed', error='Scan cancelled (timeout)')
+        raise
+    except ScanError as e:
+        await asyncio.wrap_future(_write(job_id, status='failed', error=str(e)))
+        raise
+    except Exception as e:
+        logging.error(f"Global Analysis error: {e}")
+        await asyncio.wrap_future(_write(job_id, status='failed', error=str(e)))
+        raise
+
+    await asyncio.to_thread(cache.set, url, report, cache_variant(profile, skip))
+    report['cache'] = {'status': 'miss', 'age': 0}
+    await asyncio.wrap_future(_write(job_id, status='done', stage='done', result=report))
+    return report
+
+
+def submit_scan(url, use_cache=True, profile=SCAN_PROFILE, skip=frozenset()):
+    """Queue a scan of ``url`` and return ``(job_id, future)``.
+
+    The future resolves to the report (or raises) for callers that want to
+    wait; everyone else polls the job store. Cache hits complete immediately
+    and have no future.
+    """
+    job_id = store.create(url)
+    if use_cache:
+        cached = cache.get(url, cache_variant(profile, skip))
+        if cached:
+            report, age = cached
+            report['cache'] = {'status': 'hit', 'age': round(age, 1)}
+            store.update(job_id, status='done', stage='done', result=report)
+            return job_id, None
+
+    return job_id, engine.submit(_run_job(job_id, url, profile, skip))
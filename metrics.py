@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# When set, every worker writes its counters here and /metrics sums them,
+# so one scrape covers all gunicorn workers
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _label_str(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v).replace(chr(34), "")}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[tuple(label_values)] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {'type': 'counter', 'values': [[list(k), v] for k, v in self._values.items()]}
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        key = tuple(label_values)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {'type': 'histogram', 'buckets': list(self.buckets),
+                    'values': [[list(k), [list(c), s]] for k, (c, s) in self._values.items()]}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []
+        self._dirty = threading.Event()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def counter(self, name, doc, labels=()):
+        metric = Counter(name, doc, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, doc, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, doc, read):
+        """Register a per-process gauge computed by ``read()`` at scrape time."""
+        self._gauges.append((name, doc, read))
+
+    def snapshot(self):
+        return {m.name: {**m.snapshot(), 'doc': m.doc, 'labels': list(m.labels)} for m in self._metrics}
+
+    def flush(self):
+        """Publish this process's counters to METRICS_DIR (no-op when unset)."""
+        if not METRICS_DIR:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def flush_soon(self):
+        """Have a background thread flush(); calls made before it runs are merged into one write."""
+        if not METRICS_DIR:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+                self._flusher.start()
+        self._dirty.set()
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logging.error(f"Metrics flush error: {e}")
+
+    def _collect(self):
+        snapshots = [self.snapshot()]
+        if METRICS_DIR and os.path.isdir(METRICS_DIR):
+            own = f'{os.getpid()}.json'
+            for name in os.listdir(METRICS_DIR):
+                if name.endswith('.json') and name != own:
+                    try:
+                        with open(os.path.join(METRICS_DIR, name)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        pass
+
+        merged = {}
+        for snapshot in snapshots:
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, {**metric, 'values': {}})
+                for labels, value in metric['values']:
+                    key = tuple(labels)
+                    if metric['type'] == 'counter':
+                        target['values'][key] = target['values'].get(key, 0) + value
+                    else:
+                        counts, total = target['values'].get(key, ([0] * len(value[0]), 0.0))
+                        target['values'][key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for name, metric in self._collect().items():
+            lines.append(f'# HELP {name} {metric["doc"]}')
+            lines.append(f'# TYPE {name} {metric["type"]}')
+            labels = metric['labels']
+            for key, value in sorted(metric['values'].items()):
+                if metric['type'] == 'counter':
+                    lines.append(f'{name}{_label_str(labels, key)} {value}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric['buckets'] + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_label_str(labels + ["le"], key + (bound,))} {cumulative}')
+                lines.append(f'{name}_sum{_label_str(labels, key)} {total}')
+                lines.append(f'{name}_count{_label_str(labels, key)} {cumulative}')
+        for name, doc, read in self._gauges:
+            lines.append(f'# HELP {name} {doc}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{{pid="{os.getpid()}"}} {read()}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram('scan_stage_seconds', 'Time spent in each analysis stage.', ['stage'])
+scan_seconds = registry.histogram('scan_duration_seconds', 'End-to-end browser scan time.')
+scans_total = registry.counter('scans_total', 'Finished scans by outcome.', ['outcome'])
+cache_requests = registry.counter('scan_cache_requests_total', 'Verdict cache lookups.', ['result'])
+stage_errors = registry.counter('scan_stage_errors_total', 'Errors caught per analysis stage.', ['stage'])
+stage_timeouts = registry.counter('scan_stage_timeouts_total', 'Timeouts per analysis stage.', ['stage'])
+retained_bytes = registry.histogram('scan_retained_bytes', 'Page data (HTML, scripts, links) held by one scan.',
+                                    buckets=(65536, 262144, 1048576, 4194304, 16777216, 67108864))
+truncations = registry.counter('scan_truncations_total', 'Page data cut short by a per-scan memory cap.', ['kind'])
+
+
+class StageTimer:
+    """Wall-clock spans for the numbered stages of one scan.
+
+    :meth:`stage` closes the running stage and opens the next, matching the
+    sequential pipeline; :meth:`timed` measures work that runs alongside it.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+        self._current = None
+        self._current_started = None
+
+    def _record(self, name, seconds):
+        self.timings[name] = round(self.timings.get(name, 0) + seconds * 1000, 1)
+        stage_seconds.observe(seconds, name)
+
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._current is not None:
+            self._record(self._current, now - self._current_started)
+        self._current = name
+        self._current_started = now
+
+    async def timed(self, name, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._record(name, time.perf_counter() - started)
+
+    def finish(self):
+        """Close the last stage and return the timings in milliseconds."""
+        self.stage(None)
+        total = time.perf_counter() - self._started
+        scan_seconds.observe(total)
+        self.timings['total'] = round(total * 1000, 1)
+        return self.timings
+
+
+def is_timeout(error):
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or type(error).__name__ == 'TimeoutError'
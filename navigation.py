@@ -0,0 +1,119 @@
+import os
+import asyncio
+import logging
+
+# 'settle' (domcontentloaded + bounded redirect watch) or 'networkidle' (legacy)
+NAV_STRATEGY = os.environ.get('NAV_STRATEGY', 'settle')
+NAV_TIMEOUT = int(os.environ.get('NAV_TIMEOUT', 30000))
+# Longest time to keep watching for JS/meta redirects after domcontentloaded
+NAV_SETTLE_WINDOW = float(os.environ.get('NAV_SETTLE_WINDOW', 8))
+# Navigation is considered finished after this long without a main-frame change
+NAV_QUIET_PERIOD = float(os.environ.get('NAV_QUIET_PERIOD', 2.5))
+
+POLL_INTERVAL = 0.1
+
+
+async def navigate(page, url, strategy=NAV_STRATEGY):
+    """Load ``url`` and wait until delayed client-side redirects have settled.
+
+    Returns ``(responses, completion)``: the main-frame document responses in
+    the order they were committed, and a dict describing which condition
+    ended the navigation. Raises whatever ``page.goto`` raises.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    documents = []
+    state = {'navigations': 0, 'last_change': started}
+
+    def on_frame_navigated(frame):
+        if frame == page.main_frame:
+            state['navigations'] += 1
+            state['last_change'] = loop.time()
+
+    def on_response(response):
+        try:
+            if (response.request.is_navigation_request() and response.frame == page.main_frame
+                    and not 300 <= response.status < 400):
+                documents.append(response)
+        except Exception:
+            pass
+
+    page.on('framenavigated', on_frame_navigated)
+    page.on('response', on_response)
+    load_task = None
+    try:
+        if strategy == 'networkidle':
+            response = await page.goto(url, wait_until='networkidle', timeout=60000)
+            condition = 'networkidle'
+        else:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=NAV_TIMEOUT)
+            # onload handlers are a favourite place for redirects, so wait for
+            # 'load' as well as a quiet period, all bounded by the settle window
+            load_task = asyncio.ensure_future(page.wait_for_load_state('load'))
+            deadline = loop.time() + NAV_SETTLE_WINDOW
+            state['last_change'] = max(state['last_change'], loop.time())
+            while True:
+                now = loop.time()
+                if now >= deadline:
+                    condition = 'settle_deadline'
+                    break
+                if load_task.done() and now - state['last_change'] >= NAV_QUIET_PERIOD:
+                    condition = 'quiet_period'
+                    break
+                await asyncio.sleep(POLL_INTERVAL)
+
+            if condition == 'settle_deadline':
+                # Don't read the DOM halfway through a navigation
+                try:
+                    await page.wait_for_load_state('domcontentloaded', timeout=5000)
+                except Exception:
+                    pass
+    finally:
+        page.remove_listener('framenavigated', on_frame_navigated)
+        page.remove_listener('response', on_response)
+        if load_task is not None:
+            load_task.cancel()
+            try:
+                await load_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    if not documents and response:
+        documents.append(response)
+
+    completion = {
+        'strategy': strategy,
+        'condition': condition,
+        'client_navigations': max(0, state['navigations'] - 1),
+        'elapsed_ms': int((loop.time() - started) * 1000)
+    }
+    logging.info(f"Navigation finished by {condition} after {completion['elapsed_ms']} ms")
+    return documents, completion
+
+
+def build_redirect_chain(documents, final_url, statuses=None):
+    """Hops for every server redirect and client-side navigation, in order.
+
+    ``statuses`` maps redirect URLs to the status codes seen over plain HTTP
+    (see triage.hop_statuses); hops not in it are labelled ``'Redirect'``.
+    """
+    statuses = statuses or {}
+    full_chain = []
+    for index, response in enumerate(documents):
+        request_chain = []
+        current_request = response.request
+        while current_request:
+            redirect_origin = current_request.redirected_from
+            if redirect_origin:
+                # Redirect responses are internal to the browser, so no status is available
+                request_chain.insert(0, {
+                    'url': redirect_origin.url,
+                    'status': statuses.get(redirect_origin.url, 'Redirect')
+                })
+                current_request = redirect_origin
+            else:
+                break
+
+        is_last = index == len(documents) - 1
+        full_chain += request_chain + [{'url': final_url if is_last else response.url, 'status': response.status}]
+    return full_chain
@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse
+
+# Signature sets live in a JSON file so they can change without a deploy
+RULES_PATH = os.environ.get('SCAN_RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json'))
+# Characters carried between streamed chunks so matches spanning a boundary are kept
+STREAM_OVERLAP = 256
+# External script bodies scanned per page, and how much of each
+SCRIPT_SCAN_LIMIT = int(os.environ.get('SCRIPT_SCAN_LIMIT', 30))
+SCRIPT_SCAN_MAX_CHARS = int(os.environ.get('SCRIPT_SCAN_MAX_CHARS', 512 * 1024))
+# Seconds the content stage waits for script bodies still downloading
+SCRIPT_SCAN_TIMEOUT = float(os.environ.get('SCRIPT_SCAN_TIMEOUT', 5))
+# Characters of the rendered document scanned (cut in the browser, before transfer)
+HTML_SCAN_MAX_CHARS = int(os.environ.get('HTML_SCAN_MAX_CHARS', 2 * 1024 * 1024))
+
+
+# Characters that make a regex more than a literal string
+REGEX_META = set('.^$*+?{}[]()|')
+
+
+def _literals(regex):
+    """The plain strings ``regex`` matches (``'Crypto|miner'`` -> two), or ``None`` for a real pattern."""
+    alternatives = ['']
+    escaped = False
+    for char in regex:
+        if escaped:
+            if char.isalnum():
+                return None  # \d, \b and friends
+            alternatives[-1] += char
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '|':
+            alternatives.append('')
+        elif char in REGEX_META:
+            return None
+        else:
+            alternatives[-1] += char
+    if escaped or not all(alternatives):
+        return None
+    return alternatives
+
+
+class Matcher:
+    """Case-insensitive signature search.
+
+    Each signature is a ``(kind, name, regex)`` triple. Signatures that are
+    plain words (or alternations of words) are found with ``in`` on a
+    lowercased copy of the text, which beats any regex pass in CPython; only
+    real patterns go through ``re``. Every signature is checked on its own,
+    so overlapping ones (``pay`` and ``paypal``) are all reported.
+    """
+
+    def __init__(self, signatures):
+        self.signatures = [(kind, name) for kind, name, _ in signatures]
+        self._checks = []
+        for (kind, name, regex) in signatures:
+            words = _literals(regex)
+            if words is not None:
+                self._checks.append(((kind, name), tuple(word.lower() for word in words), None))
+            else:
+                self._checks.append(((kind, name), None, re.compile(regex, re.IGNORECASE)))
+
+    def search(self, text, found=None, kinds=None):
+        """Add every ``(kind, name)`` seen in ``text`` to ``found`` (skipping ones already there)."""
+        found = set() if found is None else found
+        lowered = None
+        for signature, words, regex in self._checks:
+            if signature in found or (kinds is not None and signature[0] not in kinds):
+                continue
+            if words is not None:
+                if lowered is None:
+                    lowered = text.lower()
+                if any(word in lowered for word in words):
+                    found.add(signature)
+            elif regex.search(text):
+                found.add(signature)
+        return found
+
+    def stream(self):
+        return MatchStream(self)
+
+
+class MatchStream:
+    """Incremental :class:`Matcher` over text that arrives in chunks."""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.found = set()
+        self._tail = ''
+
+    def feed(self, chunk, kinds=None):
+        text = self._tail + chunk
+        self.matcher.search(text, self.found, kinds)
+        self._tail = text[-STREAM_OVERLAP:]
+
+    def end(self):
+        """Forget the carried-over tail before feeding an unrelated document."""
+        self._tail = ''
+
+    def names(self, kind):
+        """Matched names of ``kind``, in rules-file order."""
+        return [name for k, name in self.matcher.signatures if k == kind and (k, name) in self.found]
+
+
+class Rules:
+    def __init__(self, data):
+        self.content_patterns = dict(data.get('content_patterns', {}))
+        self.urgency_words = list(data.get('urgency_words', []))
+        self.url_keywords = list(data.get('url_keywords', []))
+        self.risky_tlds = tuple(tld.lower() for tld in data.get('risky_tlds', []))
+        self.trusted_hosts = {host.lower() for host in data.get('trusted_hosts', [])}
+        self.user_content_hosts = {host.lower() for host in data.get('user_content_hosts', [])}
+        # Identifies the rule set; findings made under another one are stale
+        self.version = hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+        # Page text signatures share one pass
+        self.content = Matcher(
+            [('pattern', name, regex) for name, regex in self.content_patterns.items()] +
+            [('urgency', word, re.escape(word)) for word in self.urgency_words]
+        )
+        self.url = Matcher([('keyword', kw, re.escape(kw)) for kw in self.url_keywords])
+
+    def url_keywords_in(self, url):
+        found = {name for _, name in self.url.search(url)}
+        # Keep the rules-file order for the summary text
+        return [kw for kw in self.url_keywords if kw in found]
+
+    def has_risky_tld(self, url):
+        host = (urlparse(url).hostname or '').lower()
+        return host.endswith(self.risky_tlds) if self.risky_tlds else False
+
+    def is_trusted_host(self, url):
+        # Exact hosts only: subdomains of big providers often serve user content
+        return (urlparse(url).hostname or '').lower() in self.trusted_hosts
+
+    def serves_user_content(self, url):
+        """Whether ``url`` is on (a subdomain of) a host where anyone can publish pages."""
+        labels = (urlparse(url).hostname or '').lower().split('.')
+        return any('.'.join(labels[i:]) in self.user_content_hosts for i in range(len(labels)))
+
+
+_lock = threading.Lock()
+_loaded = {'mtime': None, 'rules': None}
+
+
+def get_rules(path=RULES_PATH):
+    """Compiled rules, reloaded whenever the rules file changes on disk."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _lock:
+        if _loaded['rules'] is None or mtime != _loaded['mtime']:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    _loaded['rules'] = Rules(json.load(f))
+                logging.info(f"Loaded scan rules from {path}")
+            except (OSError, ValueError, re.error) as e:
+                logging.error(f"Could not load scan rules from {path}: {e}")
+                if _loaded['rules'] is None:
+                    _loaded['rules'] = Rules({})
+            _loaded['mtime'] = mtime
+        return _loaded['rules']
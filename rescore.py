@@ -0,0 +1,119 @@
+"""Recompute verdicts from recorded scan artifact bundles, without a browser.
+
+Bundles are written by scans when SCAN_ARTIFACTS_DIR is set. Rescoring runs the
+current rules, threat intel index and scoring over the stored HTML, scripts,
+headers and DOM findings, spread over worker processes:
+
+    python rescore.py /var/lib/redirect-detector/artifacts -j 8 -o rescored.ndjson
+    python rescore.py bundles/ --rules candidate_rules.json --changed-only
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threat_intel
+from concurrent.futures import ProcessPoolExecutor
+from artifacts import load_bundle, iter_bundles, ARTIFACTS_DIR
+from patterns import get_rules, RULES_PATH
+from threat_intel import ThreatIndex, check_threat_intel, THREAT_INTEL_INDEX
+from scoring import assess, check_headers, match_content
+
+# Bundles handed to a worker per round trip
+CHUNK_SIZE = 64
+
+_worker = {}
+
+
+def _init_worker(rules_path, index_path):
+    # Loaded once per process, not once per bundle
+    _worker['rules_path'] = rules_path
+    threat_intel.index = ThreatIndex(index_path)
+    get_rules(rules_path)
+
+
+def rescore(bundle, rules):
+    """Verdict for ``bundle`` under ``rules`` and the current threat intel index."""
+    final_url = bundle['final_url']
+    chain = bundle['redirect_chain']
+    suspicious_patterns, urgency_words = match_content(rules, bundle['html'], bundle['scripts'])
+    _, score = check_headers(bundle['headers'])
+    threat_report = check_threat_intel(final_url, chain, bundle['deep_links'])
+    assessment = assess(rules, final_url, chain, bundle['dom'], suspicious_patterns, urgency_words,
+                        bundle['network_summary']['external_domain_count'], score, threat_report)
+    return {
+        'risk_score': assessment['score'],
+        'verdict': assessment['verdict'],
+        'phishing_score': assessment['phishing_score'],
+        'phishing_verdict': assessment['phishing_verdict'],
+        'suspicious_patterns': suspicious_patterns,
+        'urgency_words': urgency_words,
+        'malicious': threat_report['malicious']
+    }
+
+
+def rescore_path(path):
+    try:
+        bundle = load_bundle(path)
+        new = rescore(bundle, get_rules(_worker['rules_path']))
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+    old = bundle['verdict']
+    return {
+        'path': path,
+        'url': bundle['url'],
+        'scanned_at': bundle['scanned_at'],
+        'old': old,
+        'new': new,
+        'changed': old['verdict'] != new['verdict'] or old['phishing_verdict'] != new['phishing_verdict']
+    }
+
+
+def _bundle_paths(inputs):
+    for item in inputs:
+        if os.path.isdir(item):
+            yield from iter_bundles(item)
+        else:
+            yield item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rescore recorded scans with the current rules.')
+    parser.add_argument('inputs', nargs='*', default=[ARTIFACTS_DIR] if ARTIFACTS_DIR else [],
+                        help='bundle files or directories (default $SCAN_ARTIFACTS_DIR)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('-o', '--output', help='write NDJSON results here instead of stdout')
+    parser.add_argument('--rules', default=RULES_PATH, help='rules file to score with')
+    parser.add_argument('--index', default=THREAT_INTEL_INDEX, help='threat intel index to check against')
+    parser.add_argument('--changed-only', action='store_true', help='only output scans whose verdict changed')
+    args = parser.parse_args(argv)
+    if not args.inputs:
+        parser.error('no bundles given and SCAN_ARTIFACTS_DIR is not set')
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.time()
+    done = changed = errors = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                 initargs=(args.rules, args.index)) as executor:
+            for record in executor.map(rescore_path, _bundle_paths(args.inputs), chunksize=CHUNK_SIZE):
+                done += 1
+                errors += 'error' in record
+                changed += bool(record.get('changed'))
+                if not args.changed_only or record.get('changed') or 'error' in record:
+                    out.write(json.dumps(record) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - started
+    rate = done / elapsed if elapsed else 0
+    logging.info(f"Rescored {done} scans in {elapsed:.1f}s ({rate:.0f}/s): {changed} verdicts changed, {errors} errors")
+    return 1 if errors == done and done else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
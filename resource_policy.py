@@ -0,0 +1,87 @@
+import os
+import base64
+import logging
+from collections import Counter
+
+# Default scan profile, overridable per request
+SCAN_PROFILE = os.environ.get('SCAN_PROFILE', 'faithful')
+# Abort routed responses whose Content-Length exceeds this (0 = no cap). Checked
+# after the browser's network stack fetched the body, so it saves parse/render
+# work and memory in the page, not download bandwidth. Bodies never pass
+# through Python; responses without a length load normally.
+RESOURCE_MAX_BODY_BYTES = int(os.environ.get('RESOURCE_MAX_BODY_BYTES', 0))
+
+# 1x1 transparent GIF served in place of real images
+STUB_GIF = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+# What each profile does per Playwright resource type: 'block', 'stub' or 'cap'.
+# Types not listed load normally.
+PROFILES = {
+    # Everything loads; slowest but closest to what a user sees
+    'faithful': {},
+    # Only the DOM, scripts and the redirect chain matter for detection
+    'fast': {
+        'media': 'block',
+        'font': 'block',
+        'image': 'stub',
+        'texttrack': 'block',
+        'manifest': 'block',
+        'script': 'cap',
+        'stylesheet': 'cap',
+        'xhr': 'cap',
+        'fetch': 'cap',
+        'other': 'cap',
+    },
+}
+
+
+class ResourcePolicy:
+    """Playwright route handler that applies one scan profile to a context."""
+
+    def __init__(self, profile=SCAN_PROFILE, max_body_bytes=RESOURCE_MAX_BODY_BYTES):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown scan profile: {profile}")
+        self.profile = profile
+        self.rules = PROFILES[profile]
+        self.max_body_bytes = max_body_bytes
+        self.blocked = Counter()
+
+    @property
+    def active(self):
+        return any(action != 'cap' or self.max_body_bytes for action in self.rules.values())
+
+    async def install(self, context):
+        if self.active:
+            await context.route('**/*', self.handle)
+
+    async def handle(self, route):
+        request = route.request
+        action = self.rules.get(request.resource_type)
+        try:
+            if action == 'block':
+                self.blocked[request.resource_type] += 1
+                await route.abort('blockedbyclient')
+            elif action == 'stub':
+                self.blocked[request.resource_type] += 1
+                await route.fulfill(status=200, content_type='image/gif', body=STUB_GIF)
+            elif action == 'cap' and self.max_body_bytes and not request.is_navigation_request():
+                response = await route.fetch()
+                size = response.headers.get('content-length')
+                if size and size.isdigit() and int(size) > self.max_body_bytes:
+                    self.blocked[request.resource_type] += 1
+                    await route.abort('blockedbyclient')
+                else:
+                    # Fulfilled from the fetched response as is: the body stays in the driver
+                    await route.fulfill(response=response)
+            else:
+                await route.continue_()
+        except Exception as e:
+            # Page closed or request already handled
+            logging.debug(f"Route handling error: {e}")
+
+    def summary(self):
+        return {
+            'profile': self.profile,
+            'blocked_requests': sum(self.blocked.values()),
+            'blocked_types': dict(self.blocked)
+        }
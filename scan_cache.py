@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from metrics import cache_requests
+
+# Verdict cache tuning
+CACHE_TTL = int(os.environ.get('SCAN_CACHE_TTL', 600))
+CACHE_MAX_BYTES = int(os.environ.get('SCAN_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Optional SQLite file shared by all gunicorn workers
+CACHE_PATH = os.environ.get('SCAN_CACHE_PATH')
+
+# Query parameters that never change what a page is
+TRACKING_PARAMS = {'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid', 'ref_src'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def cache_variant(profile, skip):
+    """Cache key suffix: reports differ by resource profile and skipped stages."""
+    return f"{profile}:{','.join(sorted(skip))}"
+
+
+def normalize_url(url):
+    """Canonical form of ``url`` used as the cache key."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class _MemoryStore:
+    """In-process LRU bounded by the serialized size of its entries."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, stored_at, payload):
+        self.delete(key)
+        self._entries[key] = (stored_at, payload)
+        self.bytes += len(payload)
+        while self.bytes > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _SQLiteStore:
+    """On-disk store shared between worker processes."""
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS scan_cache (
+            key TEXT PRIMARY KEY,
+            stored_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        )''')
+        self._db.commit()
+
+    def get(self, key):
+        row = self._db.execute('SELECT stored_at, payload FROM scan_cache WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            self._db.execute('UPDATE scan_cache SET used_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+        return row
+
+    def set(self, key, stored_at, payload):
+        self._db.execute('INSERT OR REPLACE INTO scan_cache VALUES (?, ?, ?, ?)', (key, stored_at, time.time(), payload))
+        # Evict least recently used rows until the table fits its budget
+        total = self._db.execute('SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM scan_cache').fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute('SELECT key, LENGTH(payload) FROM scan_cache ORDER BY used_at LIMIT 1').fetchone()
+            if row is None:
+                break
+            self._db.execute('DELETE FROM scan_cache WHERE key = ?', (row[0],))
+            total -= row[1]
+        self._db.commit()
+
+    def delete(self, key):
+        self._db.execute('DELETE FROM scan_cache WHERE key = ?', (key,))
+        self._db.commit()
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM scan_cache').fetchone()[0]
+
+
+class ScanCache:
+    """TTL + LRU cache of finished scan reports keyed on the normalized URL."""
+
+    def __init__(self, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, path=CACHE_PATH):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path:
+            logging.info(f"Scan cache backed by {path}")
+            self._store = _SQLiteStore(path, max_bytes)
+        else:
+            self._store = _MemoryStore(max_bytes)
+
+    def _key(self, url, variant):
+        # Reports built with stages skipped are cached apart from full ones
+        key = normalize_url(url)
+        return f"{key}#{variant}" if variant else key
+
+    def get(self, url, variant=''):
+        """Return ``(report, age_seconds)`` for a fresh entry, else ``None``."""
+        key = self._key(url, variant)
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                age = time.time() - stored_at
+                if age <= self.ttl:
+                    self.hits += 1
+                    cache_requests.inc('hit')
+                    return json.loads(payload), age
+                self._store.delete(key)
+            self.misses += 1
+        cache_requests.inc('miss')
+        return None
+
+    def set(self, url, report, variant=''):
+        payload = json.dumps(report)
+        with self._lock:
+            self._store.set(self._key(url, variant), time.time(), payload)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._store),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl
+            }
+
+
+cache = ScanCache()
@@ -0,0 +1,56 @@
+"""Scan a list of URLs from the command line without going through HTTP.
+
+Usage:
+    python scan_cli.py urls.txt                 # one URL per line, or NDJSON
+    cat urls.ndjson | python scan_cli.py - -c 32 -o results.ndjson
+"""
+import sys
+import json
+import time
+import argparse
+import logging
+from batch import run_batch, parse_url_lines, dedupe_urls, BATCH_CONCURRENCY
+from resource_policy import PROFILES, SCAN_PROFILE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch scan URLs for redirects and clickjacking.')
+    parser.add_argument('input', help="file with one URL per line or NDJSON ('-' for stdin)")
+    parser.add_argument('-o', '--output', help='write NDJSON results here instead of stdout')
+    parser.add_argument('-c', '--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help=f'scans in flight at once (default {BATCH_CONCURRENCY})')
+    parser.add_argument('--no-cache', action='store_true', help='ignore cached reports')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=SCAN_PROFILE,
+                        help=f'resource profile (default {SCAN_PROFILE})')
+    args = parser.parse_args(argv)
+
+    if args.input == '-':
+        urls = parse_url_lines(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            urls = parse_url_lines(f)
+
+    total = len(dedupe_urls(urls))
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.time()
+    done = errors = 0
+    try:
+        for record in run_batch(urls, concurrency=args.concurrency, use_cache=not args.no_cache,
+                                profile=args.profile):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            done += 1
+            errors += 'error' in record
+            logging.info(f"[{done}/{total}] {record['url']}")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - started
+    logging.info(f"Scanned {done} URLs ({errors} errors) in {elapsed:.1f}s")
+    return 1 if errors == done and done else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import logging
+import threading
+
+# Maximum scans running at once in one worker process
+SCAN_CONCURRENCY = int(os.environ.get('SCAN_CONCURRENCY', 4))
+SCAN_TIMEOUT = int(os.environ.get('SCAN_TIMEOUT', 150))
+
+
+class ScanEngine:
+    """Background asyncio loop that runs scans for this worker process.
+
+    Flask request threads hand coroutines to :meth:`submit` and wait on the
+    returned future, while the loop itself interleaves up to ``concurrency`` scans.
+    """
+
+    def __init__(self, concurrency=SCAN_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.active = 0
+        self._loop = None
+        self._semaphore = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        # The loop thread must be started inside the worker, not the gunicorn master
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+                started.set()
+                loop.run_forever()
+
+            threading.Thread(target=run_loop, name='scan-engine', daemon=True).start()
+            started.wait()
+            logging.info(f"Scan engine started (concurrency={self.concurrency})")
+            self._loop = loop
+            self._pid = os.getpid()
+            return loop
+
+    async def _limited(self, coro):
+        async with self._semaphore:
+            self.active += 1
+            try:
+                return await coro
+            finally:
+                self.active -= 1
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the engine loop and return a concurrent future."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), loop)
+
+    def shutdown(self, cleanup=None, timeout=10):
+        """Run ``cleanup()`` on the loop, then stop it. No-op if this process never started one."""
+        with self._lock:
+            loop = self._loop if self._pid == os.getpid() else None
+        if loop is None:
+            return
+        if cleanup is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cleanup(), loop).result(timeout)
+            except Exception as e:
+                logging.error(f"Scan engine shutdown error: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+    def stats(self):
+        return {'concurrency': self.concurrency, 'active': self.active}
+
+
+engine = ScanEngine()
@@ -0,0 +1,162 @@
+import os
+import json
+import logging
+import time
+import sqlite3
+import tempfile
+import threading
+from scan_cache import normalize_url
+
+# SQLite file shared by every gunicorn worker
+HISTORY_DB = os.environ.get('SCAN_HISTORY_DB', os.path.join(tempfile.gettempdir(), 'redirect_detector_history.db'))
+# Scans kept per URL
+HISTORY_KEEP = int(os.environ.get('SCAN_HISTORY_KEEP', 20))
+# Seconds any scan is kept, so URLs that are never scanned again age out too
+HISTORY_RETENTION = int(os.environ.get('SCAN_HISTORY_RETENTION', 30 * 86400))
+# An unchanged page reuses findings rendered at most this long ago (0 always re-renders)
+HISTORY_REUSE_MAX_AGE = int(os.environ.get('SCAN_HISTORY_REUSE_MAX_AGE', 86400))
+
+# Report keys that describe one request rather than the page
+VOLATILE_KEYS = ('timings', 'cache', 'history')
+
+
+class ScanHistory:
+    """Past scans per normalized URL: the HTTP fingerprint and the report."""
+
+    def __init__(self, path=HISTORY_DB):
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS scan_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_key TEXT NOT NULL,
+                scanned_at REAL NOT NULL,
+                rendered_at REAL NOT NULL,
+                profile TEXT NOT NULL,
+                skip TEXT NOT NULL,
+                http_chain TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                report TEXT NOT NULL,
+                rules_version TEXT
+            )''')
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(scan_history)')}
+            if 'rules_version' not in columns:
+                # Databases from before rules were versioned; their scans are never reused
+                self._db.execute('ALTER TABLE scan_history ADD COLUMN rules_version TEXT')
+            self._db.execute('CREATE INDEX IF NOT EXISTS scan_history_url ON scan_history (url_key, scanned_at)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS scan_history_age ON scan_history (scanned_at)')
+            self._db.commit()
+
+    def latest(self, url):
+        try:
+            with self._lock:
+                row = self._db.execute('SELECT * FROM scan_history WHERE url_key = ? ORDER BY scanned_at DESC LIMIT 1',
+                                       (normalize_url(url),)).fetchone()
+        except sqlite3.Error as e:
+            # History only saves work; a scan never fails because of it
+            logging.error(f"Scan history read error: {e}")
+            return None
+        if row is None:
+            return None
+        entry = {k: row[k] for k in row.keys()}
+        entry['skip'] = json.loads(entry['skip'])
+        entry['http_chain'] = json.loads(entry['http_chain']) if entry['http_chain'] else None
+        entry['report'] = json.loads(entry['report'])
+        if entry['http_chain']:
+            entry['final_url'] = entry['http_chain'][-1]['url']
+        return entry
+
+    def record(self, url, report, triage, profile, skip, rendered_at, rules_version, previous=None):
+        key = normalize_url(url)
+        headers = triage['headers'] if triage else {}
+        # A 304 carries no body and may omit validators; keep the last known ones
+        carried = previous if previous and triage and triage['status'] == 304 else {}
+        etag = headers.get('etag') or carried.get('etag')
+        last_modified = headers.get('last-modified') or carried.get('last_modified')
+        content_hash = carried.get('content_hash') if carried else (triage['content_hash'] if triage else None)
+        stored = {k: v for k, v in report.items() if k not in VOLATILE_KEYS}
+        try:
+            self._insert(key, stored, triage, profile, skip, rendered_at, rules_version, etag, last_modified,
+                         content_hash)
+        except sqlite3.Error as e:
+            logging.error(f"Scan history write error: {e}")
+
+    def _insert(self, key, stored, triage, profile, skip, rendered_at, rules_version, etag, last_modified,
+                content_hash):
+        now = time.time()
+        with self._lock:
+            self._db.execute('DELETE FROM scan_history WHERE scanned_at < ?', (now - HISTORY_RETENTION,))
+            self._db.execute(
+                'INSERT INTO scan_history (url_key, scanned_at, rendered_at, profile, skip, http_chain, etag,'
+                ' last_modified, content_hash, report, rules_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, now, rendered_at, profile, json.dumps(sorted(skip)),
+                 json.dumps(triage['hops']) if triage else None, etag, last_modified, content_hash, json.dumps(stored),
+                 rules_version))
+            self._db.execute('''DELETE FROM scan_history WHERE url_key = ? AND id NOT IN (
+                SELECT id FROM scan_history WHERE url_key = ? ORDER BY scanned_at DESC LIMIT ?)''',
+                             (key, key, HISTORY_KEEP))
+            self._db.commit()
+
+
+history = ScanHistory()
+
+
+def can_reuse(previous, triage, profile, skip, rules_version):
+    """Whether the last scan's findings still describe the page.
+
+    True when the server-side chain is the same, the final document answered
+    304 or hashes the same, the profile and rule set match, the last scan ran
+    every stage this one needs, and its render is recent enough.
+    """
+    if not previous or not triage or not previous['http_chain'] or HISTORY_REUSE_MAX_AGE <= 0:
+        return False
+    if time.time() - previous['rendered_at'] > HISTORY_REUSE_MAX_AGE:
+        return False
+    if previous['profile'] != profile or not set(previous['skip']) <= set(skip):
+        return False
+    if previous.get('rules_version') != rules_version:
+        # Patterns and urgency words are copied from the last scan, so they must be current
+        return False
+
+    before, after = previous['http_chain'], triage['hops']
+    if [h['url'] for h in before] != [h['url'] for h in after]:
+        return False
+    if [h['status'] for h in before[:-1]] != [h['status'] for h in after[:-1]]:
+        return False
+    if triage['status'] == 304:
+        return True
+    return triage['content_hash'] is not None and triage['content_hash'] == previous['content_hash']
+
+
+def _facts(report):
+    security = report.get('security_scan', {})
+    return {
+        'final_url': report.get('final_url'),
+        'redirect_chain': [hop.get('url') for hop in report.get('redirect_chain', [])],
+        'verdict': security.get('verdict'),
+        'phishing_score': report.get('simple_analysis', {}).get('phishing_score'),
+        'blacklisted': security.get('threat_intel', {}).get('malicious'),
+        'suspicious_patterns': sorted(security.get('suspicious_patterns', [])),
+        'hidden_iframes': len(report.get('hidden_iframes', [])),
+        'clickjacking_risks': len(report.get('clickjacking_risks', [])),
+        'form_actions': sorted({f.get('action') for f in report.get('form_risks', [])}),
+        'missing_headers': sorted(h for h, v in security.get('headers', {}).items() if not v.get('present')),
+    }
+
+
+def compare_scans(previous, report, triage=None):
+    """"What changed since the last scan" block for ``report``."""
+    if not previous:
+        return {'previous_scan': None, 'changes': []}
+
+    before, after = _facts(previous['report']), _facts(report)
+    changes = [{'field': name, 'before': before[name], 'after': after[name]}
+               for name in after if before[name] != after[name]]
+    if triage and triage['content_hash'] and previous['content_hash'] \
+            and triage['content_hash'] != previous['content_hash']:
+        changes.append({'field': 'content', 'before': previous['content_hash'], 'after': triage['content_hash']})
+    return {'previous_scan': previous['scanned_at'], 'changes': changes}
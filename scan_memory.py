@@ -0,0 +1,91 @@
+import os
+from urllib.parse import urlparse
+from metrics import retained_bytes, truncations
+
+# Page data (HTML, script bodies, links) one scan may hold in Python
+SCAN_MEMORY_BUDGET = int(os.environ.get('SCAN_MEMORY_BUDGET', 16 * 1024 * 1024))
+# Network log: requests kept verbatim, and distinct hosts counted individually
+NETWORK_SAMPLE_SIZE = int(os.environ.get('NETWORK_SAMPLE_SIZE', 50))
+NETWORK_MAX_DOMAINS = int(os.environ.get('NETWORK_MAX_DOMAINS', 500))
+
+
+class MemoryLedger:
+    """Per-scan accounting of retained page data against a fixed budget.
+
+    Callers ask for a :meth:`limit` before materializing data and
+    :meth:`charge` what they kept; once the budget is spent, limits drop to
+    zero and later data is skipped rather than held.
+    """
+
+    def __init__(self, budget=SCAN_MEMORY_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.by_kind = {}
+        self.truncated = {}
+
+    def limit(self, cap):
+        return max(0, min(cap, self.budget - self.used))
+
+    def charge(self, kind, size, truncated=False):
+        self.used += size
+        self.by_kind[kind] = self.by_kind.get(kind, 0) + size
+        if truncated:
+            self.truncated[kind] = self.truncated.get(kind, 0) + 1
+            truncations.inc(kind)
+
+    def summary(self):
+        retained_bytes.observe(self.used)
+        return {'budget': self.budget, 'used': self.used, 'by_kind': self.by_kind, 'truncated': self.truncated}
+
+
+class NetworkLog:
+    """Streaming aggregates of a page's requests in constant memory.
+
+    Keeps counts per resource type and per host (up to ``max_domains``
+    hosts; the rest are only counted) plus the first ``sample_size``
+    requests verbatim.
+    """
+
+    def __init__(self, page_url, sample_size=NETWORK_SAMPLE_SIZE, max_domains=NETWORK_MAX_DOMAINS):
+        self.page_netloc = urlparse(page_url).netloc
+        self.sample_size = sample_size
+        self.max_domains = max_domains
+        self.total = 0
+        self.sample = []
+        self.type_counts = {}
+        self.domain_counts = {}
+        self.other_domain_requests = 0
+
+    def record(self, url, method, resource_type):
+        self.total += 1
+        self.type_counts[resource_type] = self.type_counts.get(resource_type, 0) + 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append({'url': url[:150], 'method': method, 'resourceType': resource_type})
+
+        netloc = urlparse(url).netloc
+        if not netloc:
+            return
+        if netloc in self.domain_counts or len(self.domain_counts) < self.max_domains:
+            self.domain_counts[netloc] = self.domain_counts.get(netloc, 0) + 1
+        else:
+            self.other_domain_requests += 1
+
+    def is_external(self, netloc):
+        # Identify external domains (potential trackers or C2)
+        return netloc != self.page_netloc and not netloc.endswith('.' + self.page_netloc)
+
+    def external_domains(self):
+        """External hosts, busiest first."""
+        external = [d for d in self.domain_counts if self.is_external(d)]
+        return sorted(external, key=lambda d: -self.domain_counts[d])
+
+    def summary(self):
+        external = self.external_domains()
+        return {
+            'total_requests': self.total,
+            'external_domains': external[:15],
+            'external_domain_count': len(external),
+            'types': [req['resourceType'] for req in self.sample],
+            'type_counts': self.type_counts,
+            'domains_not_tracked': self.other_domain_requests
+        }
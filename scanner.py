@@ -0,0 +1,436 @@
+import os
+import time
+import asyncio
+import base64
+import logging
+from urllib.parse import urlsplit
+from browser_pool import pool
+from deep_links import scan_deep_links
+from server_intel import get_server_info
+from resource_policy import ResourcePolicy, SCAN_PROFILE
+from navigation import navigate, build_redirect_chain
+from triage import triage_url, hop_statuses
+from patterns import get_rules, SCRIPT_SCAN_LIMIT, SCRIPT_SCAN_MAX_CHARS, SCRIPT_SCAN_TIMEOUT, HTML_SCAN_MAX_CHARS
+from threat_intel import check_threat_intel
+from dom_analyzer import analyze_dom, empty_analysis, failed_analysis
+from screenshots import screenshot_store, SCREENSHOT_MODE
+from scan_memory import MemoryLedger, NetworkLog
+from scan_history import history, can_reuse, compare_scans
+from scoring import assess, check_headers
+from artifacts import ARTIFACTS_DIR, record_bundle
+from metrics import StageTimer, registry, scans_total, stage_errors, stage_timeouts, is_timeout
+
+
+class ScanError(Exception):
+    """Raised when the target page cannot be analyzed at all."""
+
+
+def prepare_url(url):
+    """Default bare hostnames to http:// the way the dashboard does.
+
+    Raises ``ValueError`` for URLs that cannot be parsed (a non-numeric or
+    out-of-range port).
+    """
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'http://' + url
+    try:
+        urlsplit(url).port
+    except ValueError as e:
+        raise ValueError(f"Invalid URL: {e}") from None
+    return url
+
+
+# Serialized rendered document, cut to a length inside the page
+HTML_SCRIPT = 'max => document.documentElement ? document.documentElement.outerHTML.slice(0, max) : ""'
+
+def _no_progress(stage):
+    pass
+
+
+async def analyze_url(url, progress=_no_progress, profile=SCAN_PROFILE, skip=frozenset()):
+    """Run the full browser analysis for ``url`` and return the report.
+
+    ``progress`` is called with the name of each stage as it starts.
+    ``profile`` selects the resource policy (see resource_policy.PROFILES).
+    ``skip`` names optional stages to leave out: ``screenshot``, ``deep_links``
+    and ``server_info``.
+    """
+    try:
+        report = await _run_analysis(url, progress, profile, skip)
+    except BaseException:
+        scans_total.inc('failed')
+        raise
+    finally:
+        # Off the event loop: the file write must not stall the other scans
+        registry.flush_soon()
+    scans_total.inc('ok')
+    return report
+
+
+async def _run_analysis(url, progress, profile, skip):
+    policy = ResourcePolicy(profile)
+    timer = StageTimer()
+    ledger = MemoryLedger()
+
+    def stage(name):
+        timer.stage(name)
+        progress(name)
+
+    rules = get_rules()
+    previous = await asyncio.to_thread(history.latest, url)
+
+    # --- 0. HTTP Pre-Triage (real hop status codes; skip the browser when conclusive) ---
+    stage('triage')
+    fingerprint = previous if previous and previous['http_chain'] else None
+    triage = await asyncio.to_thread(triage_url, url, rules.is_trusted_host, previous=fingerprint)
+
+    # Inputs kept for the artifact bundle (see rescore.py); None when recording is off
+    capture = {} if ARTIFACTS_DIR else None
+    reused = can_reuse(previous, triage, profile, skip, rules.version)
+    rendered_at = previous['rendered_at'] if reused else time.time()
+    if reused:
+        # Same chain, same document: only the lookups and the scoring are redone
+        report = await _reused_analysis(previous, triage, rules, ledger, timer, stage, skip)
+    elif triage and not triage['render']:
+        report = await _http_only_analysis(triage, rules, policy, ledger, timer, stage, skip, capture)
+    else:
+        report = await _browser_analysis(url, triage, rules, policy, ledger, timer, stage, skip, capture)
+
+    report['history'] = {**compare_scans(previous, report, triage), 'reused': reused}
+    await asyncio.to_thread(history.record, url, report, triage, profile, skip, rendered_at, rules.version,
+                            previous)
+    if capture is not None and not reused:
+        await asyncio.to_thread(record_bundle, url, profile, report, capture)
+    return report
+
+
+async def _browser_analysis(url, triage, rules, policy, ledger, timer, stage, skip, capture=None):
+    # Fresh isolated context from the warm browser pool
+    stage('browser')
+    async with pool.context() as context:
+        await policy.install(context)
+        page = await context.new_page()
+
+        # --- 1. Network & Resource Logging ---
+        # Aggregated as requests stream in, so ad-heavy pages cost no more than simple ones
+        network = NetworkLog(url)
+
+        def handle_request(request):
+            try:
+                network.record(request.url, request.method, request.resource_type)
+            except Exception:
+                pass
+
+        page.on("request", handle_request)
+
+        # External scripts are pattern-scanned along with the document
+        script_bodies = []
+
+        async def script_text(response):
+            try:
+                text = await response.text()
+            except Exception:
+                return ''
+            # Keep only what fits the scan's budget; the full body is dropped right away
+            limit = ledger.limit(SCRIPT_SCAN_MAX_CHARS)
+            ledger.charge('scripts', min(len(text), limit), truncated=len(text) > limit)
+            return text[:limit]
+
+        def handle_response(response):
+            if response.request.resource_type != 'script' or len(script_bodies) >= SCRIPT_SCAN_LIMIT:
+                return
+            size = response.headers.get('content-length')
+            if size and size.isdigit() and int(size) > ledger.limit(SCRIPT_SCAN_MAX_CHARS) * 4:
+                # Far larger than we would keep: don't pull it into Python at all
+                ledger.charge('scripts', 0, truncated=True)
+                return
+            script_bodies.append(asyncio.ensure_future(script_text(response)))
+
+        page.on("response", handle_response)
+
+        # --- 2. Navigation & Redirects ---
+        stage('navigation')
+        full_chain = []
+        final_url = url
+        response = None
+
+        try:
+            logging.info(f"Navigating to {url}")
+            documents, navigation = await navigate(page, url)
+            final_url = page.url
+
+            if documents:
+                # Headers and status come from the document the user ends up on
+                response = documents[-1]
+                full_chain = build_redirect_chain(documents, final_url, hop_statuses(triage))
+            else:
+                full_chain = [{'url': url, 'status': 'No Response'}]
+
+        except Exception as e:
+            logging.error(f"Navigation error: {e}")
+            (stage_timeouts if is_timeout(e) else stage_errors).inc('navigation')
+            raise ScanError(f'Failed to load page: {str(e)}')
+
+        # Host intel only needs the final URL; run it alongside the page stages
+        server_info_task = _start_server_info(timer, final_url, skip)
+
+        # --- 3. Content Security & Pattern Analysis ---
+        stage('content')
+        # Scan the HTML and script bodies for every signature
+        matches = rules.content.stream()
+        try:
+            limit = ledger.limit(HTML_SCAN_MAX_CHARS)
+            html = await page.evaluate(HTML_SCRIPT, limit)
+            ledger.charge('html', len(html), truncated=len(html) >= limit)
+            # Off the event loop: a 2 MB page must not stall the other scans
+            await asyncio.to_thread(matches.feed, html)
+            matches.end()
+            if capture is not None:
+                capture['html'], capture['scripts'] = html, []
+            del html
+            page.remove_listener("response", handle_response)
+            # A body that never completes (tarpit, long-poll) must not hold up the scan
+            deadline = asyncio.get_running_loop().time() + SCRIPT_SCAN_TIMEOUT
+            while script_bodies:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    text = await asyncio.wait_for(script_bodies.pop(0), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    stage_timeouts.inc('scripts')
+                    ledger.charge('scripts', 0, truncated=True)
+                    # Past the deadline only bodies that already arrived are read
+                    continue
+                if capture is not None:
+                    capture['scripts'].append(text)
+                # Urgency wording only counts when it is visible page text
+                await asyncio.to_thread(matches.feed, text, ('pattern',))
+                matches.end()
+        except Exception as e:
+            logging.error(f"Content analysis error: {e}")
+            stage_errors.inc('content')
+        finally:
+            for task in script_bodies:
+                task.cancel()
+
+        # --- 4. DOM Analysis (Iframes, Clickjacking, Storage) ---
+        stage('dom')
+        try:
+            dom_analysis = await analyze_dom(page)
+            ledger.charge('links', sum(len(l['href']) + len(l['text']) for l in dom_analysis['links']))
+        except Exception as e:
+            logging.error(f"DOM Evaluation error: {e}")
+            stage_errors.inc('dom')
+            dom_analysis = failed_analysis(e)
+
+        # --- 5. Screenshot & Visuals ---
+        stage('screenshot')
+        screenshot_b64 = None
+        screenshot_url = None
+        if 'screenshot' not in skip and SCREENSHOT_MODE != 'off':
+            try:
+                # Capture full page or viewport screenshot
+                screenshot_bytes = await page.screenshot(type='jpeg', quality=60, full_page=False)
+                if SCREENSHOT_MODE == 'inline':
+                    screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+                else:
+                    # Stored out of band; clients fetch it only when showing the full report
+                    digest = await asyncio.to_thread(screenshot_store.put, screenshot_bytes)
+                    screenshot_url = f"/screenshots/{digest}"
+            except Exception as e:
+                logging.error(f"Screenshot error: {e}")
+                stage_errors.inc('screenshot')
+
+        # --- 6. Security Header Analysis ---
+        stage('headers')
+        security_headers, score = check_headers(response.headers if response else None)
+
+        # --- 7. Deep Link Scan (concurrent, bounded by a deadline) ---
+        stage('deep_links')
+        deep_link_results = []
+        if 'deep_links' not in skip:
+            deep_link_results = await scan_deep_links(context, dom_analysis['links'])
+
+    if capture is not None:
+        capture.update(headers=response.headers if response else {}, dom=dom_analysis,
+                       network_sample=network.sample)
+
+    return await _finish_report(
+        stage, timer, rules, triage,
+        final_url=final_url,
+        full_chain=full_chain,
+        navigation=navigation,
+        network_summary={**network.summary(), **policy.summary()},
+        ledger=ledger,
+        suspicious_patterns=matches.names('pattern'),
+        urgency_words=matches.names('urgency'),
+        dom_analysis=dom_analysis,
+        screenshot_b64=screenshot_b64,
+        screenshot_url=screenshot_url,
+        security_headers=security_headers,
+        score=score,
+        deep_link_results=deep_link_results,
+        server_info_task=server_info_task
+    )
+
+
+async def _http_only_analysis(triage, rules, policy, ledger, timer, stage, skip, capture=None):
+    """Report for a URL whose plain HTTP answer needs no rendering.
+
+    Non-HTML targets cannot run redirect scripts or overlays, and trusted
+    hosts are not worth a browser; both are scored from the response alone.
+    """
+    final_url = triage['final_url']
+    server_info_task = _start_server_info(timer, final_url, skip)
+    network = NetworkLog(triage['hops'][0]['url'])
+    for hop in triage['hops']:
+        network.record(hop['url'], 'GET', 'document')
+    if capture is not None:
+        capture.update(html=triage['body'], headers=triage['headers'], network_sample=network.sample)
+
+    stage('content')
+    ledger.charge('html', len(triage['body']))
+    matches = rules.content.stream()
+    matches.feed(triage['body'])
+    matches.end()
+
+    stage('headers')
+    security_headers, score = check_headers(triage['headers'])
+
+    return await _finish_report(
+        stage, timer, rules, triage,
+        final_url=final_url,
+        full_chain=triage['hops'],
+        navigation={
+            'strategy': 'http',
+            'condition': triage['reason'],
+            'client_navigations': 0,
+            'elapsed_ms': triage['elapsed_ms']
+        },
+        network_summary={**network.summary(), **policy.summary()},
+        ledger=ledger,
+        suspicious_patterns=matches.names('pattern'),
+        urgency_words=matches.names('urgency'),
+        dom_analysis=empty_analysis(),
+        screenshot_b64=None,
+        screenshot_url=None,
+        security_headers=security_headers,
+        score=score,
+        deep_link_results=[],
+        server_info_task=server_info_task
+    )
+
+
+async def _reused_analysis(previous, triage, rules, ledger, timer, stage, skip):
+    """Rebuild a report from the last scan's findings without rendering.
+
+    Threat intel, server info and scoring are redone, so a host that was
+    blacklisted since still flips the verdict.
+    """
+    old = previous['report']
+    security = old['security_scan']
+    final_url = old['final_url']
+    server_info_task = _start_server_info(timer, final_url, skip)
+
+    screenshot_b64, screenshot_url = None, None
+    if 'screenshot' not in skip:
+        screenshot_b64 = security.get('screenshot')
+        digest = (security.get('screenshot_url') or '').rsplit('/', 1)[-1]
+        path = screenshot_store.path(digest) if digest else None
+        if path and os.path.exists(path):
+            screenshot_url = security['screenshot_url']
+
+    stage('headers')
+    headers = security.get('headers', {})
+    score = 100 - 10 * sum(1 for h in headers.values() if not h['present'])
+
+    return await _finish_report(
+        stage, timer, rules, {**triage, 'render': False, 'reason': 'unchanged'},
+        final_url=final_url,
+        full_chain=old['redirect_chain'],
+        navigation={**old['navigation'], 'reused_from': previous['scanned_at']},
+        network_summary=old['network_summary'],
+        ledger=ledger,
+        suspicious_patterns=security['suspicious_patterns'],
+        urgency_words=security.get('urgency_words', []),
+        dom_analysis={
+            'iframes': old['hidden_iframes'],
+            'clickjacking': old['clickjacking_risks'],
+            'forms': old['form_risks'],
+            'links': [],
+            'storage': security.get('storage_usage', {}),
+            'budget': old.get('dom_budget', {})
+        },
+        screenshot_b64=screenshot_b64,
+        screenshot_url=screenshot_url,
+        security_headers=headers,
+        score=score,
+        deep_link_results=old['deep_scan_results'] if 'deep_links' not in skip else [],
+        server_info_task=server_info_task
+    )
+
+
+def _start_server_info(timer, final_url, skip):
+    if 'server_info' in skip:
+        return None
+    return asyncio.ensure_future(timer.timed('server_intel', get_server_info(final_url)))
+
+
+async def _finish_report(stage, timer, rules, triage, final_url, full_chain, navigation,
+                         network_summary, ledger, suspicious_patterns, urgency_words, dom_analysis, screenshot_b64,
+                         screenshot_url, security_headers, score, deep_link_results, server_info_task):
+    """Threat intel, server info and scoring shared by the browser and HTTP-only paths."""
+
+    # --- 8. Threat Intelligence (Global Blacklist) ---
+    stage('threat_intel')
+    threat_report = check_threat_intel(final_url, full_chain, deep_link_results)
+    
+    # --- 9. Server & SSL Intelligence ---
+    stage('server_info')
+    server_info = await server_info_task if server_info_task else None
+
+    # --- 9. User-Friendly Intelligence (Phishing & Summary) ---
+    stage('scoring')
+    assessment = assess(rules, final_url, full_chain, dom_analysis, suspicious_patterns, urgency_words,
+                        network_summary['external_domain_count'], score, threat_report)
+
+    timings = timer.finish()
+
+    return {
+        'final_url': final_url,
+        'redirect_chain': full_chain,
+        'navigation': navigation,
+        'triage': {
+            'rendered': not triage or triage['render'],
+            'reason': triage['reason'] if triage else None,
+            'status': triage['status'] if triage else None,
+            'content_type': triage['content_type'] if triage else None
+        },
+        'timings': timings,
+        'hidden_iframes': dom_analysis['iframes'],
+        'clickjacking_risks': dom_analysis['clickjacking'],
+        'form_risks': dom_analysis['forms'],
+        'dom_budget': dom_analysis.get('budget', {}),
+        'deep_scan_results': deep_link_results,
+        'network_summary': network_summary,
+        'memory': ledger.summary(),
+        'security_scan': {
+            'risk_score': assessment['risk_score'],
+            'verdict': assessment['verdict'],
+            'suspicious_patterns': suspicious_patterns,
+            'urgency_words': urgency_words,
+            'threat_intel': threat_report,
+            'storage_usage': dom_analysis.get('storage', {}),
+            'headers': security_headers,
+            'screenshot': screenshot_b64,
+            'screenshot_url': screenshot_url,
+            'risk_score': assessment['score'],
+            'verdict': assessment['verdict']
+        },
+        'server_info': server_info,
+        'simple_analysis': {
+            'summary': assessment['summary'],
+            'phishing_score': assessment['phishing_score'],
+            'phishing_verdict': assessment['phishing_verdict']
+        }
+    }
@@ -0,0 +1,129 @@
+"""Verdict scoring from scan findings, shared by live scans and rescore.py.
+
+Everything here is pure: it needs the findings, the rules and a threat
+intel result, never a browser or the network.
+"""
+
+SECURITY_HEADERS = {
+    'Strict-Transport-Security': 'HSTS (Prevents downgrade attacks)',
+    'Content-Security-Policy': 'CSP (Mitigates XSS/Injection)',
+    'X-Frame-Options': 'Clickjacking Protection',
+    'X-Content-Type-Options': 'MIME Sniffing Protection',
+    'Referrer-Policy': 'Referrer Leakage Control'
+}
+
+
+def check_headers(headers):
+    """Presence of the key security headers, and the score left after deductions."""
+    security_headers = {}
+    score = 100
+    if headers is None:
+        return security_headers, score
+
+    for header, desc in SECURITY_HEADERS.items():
+        # Playwright headers are lowercase
+        val = headers.get(header.lower())
+        if val:
+            security_headers[header] = {'present': True, 'value': val[:50] + '...', 'desc': desc}
+        else:
+            security_headers[header] = {'present': False, 'value': 'Missing', 'desc': desc}
+            score -= 10 # Deduct score for missing headers
+    return security_headers, score
+
+
+def match_content(rules, html, scripts=()):
+    """Content pattern and urgency-word names found in a document and its scripts."""
+    matches = rules.content.stream()
+    matches.feed(html)
+    matches.end()
+    for text in scripts:
+        # Urgency wording only counts when it is visible page text
+        matches.feed(text, kinds=('pattern',))
+        matches.end()
+    return matches.names('pattern'), matches.names('urgency')
+
+
+def assess(rules, final_url, full_chain, dom_analysis, suspicious_patterns, urgency_words,
+           external_domain_count, score, threat_report):
+    """Score one page.
+
+    ``score`` is the header score from :func:`check_headers`. Returns the page
+    ``score`` after DOM/pattern deductions, the phishing ``risk_score``,
+    ``verdict``, ``phishing_score``, ``phishing_verdict`` and the ``summary`` lines.
+    """
+    # Calculate Risk Verdict
+    if dom_analysis['iframes']: score -= 20
+    if dom_analysis['clickjacking']: score -= 30
+    if dom_analysis['forms']: score -= 10
+    if suspicious_patterns: score -= 20
+    if external_domain_count > 5: score -= 10
+    
+    if score < 0: score = 0
+
+    # Phishing heuristics and the plain-language summary
+    simplified_summary = []
+    phishing_score = 0
+    
+    # Simple Summary Checks
+    if final_url.startswith('https'):
+        simplified_summary.append("✅ Connection is secure (HTTPS).")
+    else:
+        simplified_summary.append("❌ Connection is NOT secure (Unencrypted HTTP).")
+        phishing_score += 20
+
+    if len(dom_analysis['iframes']) > 0:
+        simplified_summary.append(f"⚠️ Found {len(dom_analysis['iframes'])} hidden iframes (invisible boxes).")
+    
+    if len(dom_analysis['clickjacking']) > 0:
+        simplified_summary.append("⛔ DANGER: Invisible buttons found (Clickjacking risk).")
+        phishing_score += 50
+    
+    if len(full_chain) > 1:
+        simplified_summary.append(f"➡️ Site redirected you {len(full_chain)-1} times.")
+
+    # Phishing Heuristics
+    found_keywords = rules.url_keywords_in(final_url)
+    
+    if found_keywords:
+        simplified_summary.append(f"⚠️ URL contains suspicious words: {', '.join(found_keywords)}.")
+        phishing_score += 40  # INCREASED from 15
+
+    # High Risk TLDs
+    if rules.has_risky_tld(final_url):
+         simplified_summary.append("⚠️ Domain uses a high-risk TLD often used by scammers.")
+         phishing_score += 25
+
+    # Fake urgency in content
+    phishing_score += 10 * len(urgency_words)
+
+    # Threat Intel Penalty
+    if threat_report['malicious']:
+        phishing_score += 100 # Maximum penalty
+        simplified_summary.insert(0, f"⛔ CRITICAL: Detected in Global Blacklist (Malware/Phishing). Tags: {', '.join(threat_report['tags'])}")
+    else:
+        simplified_summary.append("✅ Not found in Global Threat Databases.")
+
+    listed_links = [m for m in threat_report['matches'] if m['where'] == 'deep_link']
+    if listed_links:
+        simplified_summary.append(f"⚠️ {len(listed_links)} link(s) on this page lead to blacklisted sites.")
+
+    # Calculate Final Score
+    risk_score = max(0, 100 - phishing_score)
+    
+    verdict = "Safe"
+    if risk_score < 80: verdict = "Suspicious"
+    if risk_score < 50: verdict = "High Risk"
+    if threat_report['malicious']: verdict = "CRITICAL THREAT"
+
+    phishing_verdict = "Low"
+    if risk_score < 80: phishing_verdict = "Medium"
+    if risk_score < 50: phishing_verdict = "High"
+
+    return {
+        'score': score,
+        'risk_score': risk_score,
+        'verdict': verdict,
+        'phishing_score': phishing_score,
+        'phishing_verdict': phishing_verdict,
+        'summary': simplified_summary
+    }
@@ -0,0 +1,83 @@
+import os
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+
+# 'store' (content-addressed files served from /screenshots/<hash>),
+# 'inline' (legacy base64 in the report) or 'off'
+SCREENSHOT_MODE = os.environ.get('SCREENSHOT_MODE', 'store')
+SCREENSHOT_DIR = os.environ.get('SCREENSHOT_DIR', os.path.join(tempfile.gettempdir(), 'redirect_detector_screenshots'))
+SCREENSHOT_STORE_MAX_BYTES = int(os.environ.get('SCREENSHOT_STORE_MAX_BYTES', 512 * 1024 * 1024))
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ScreenshotStore:
+    """Content-addressed JPEG files with oldest-first eviction past a size budget.
+
+    The directory can be shared by every worker; identical screenshots are
+    stored once.
+    """
+
+    def __init__(self, root=SCREENSHOT_DIR, max_bytes=SCREENSHOT_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes = None
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        if not DIGEST_RE.match(digest):
+            return None
+        return os.path.join(self.root, digest + '.jpg')
+
+    def put(self, data):
+        """Store ``data`` and return its hex digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path)  # Refresh so popular screenshots survive eviction
+            return digest
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._total_bytes()
+            else:
+                self._approx_bytes += len(data)
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+        return digest
+
+    def _total_bytes(self):
+        return sum(e.stat().st_size for e in os.scandir(self.root) if e.name.endswith('.jpg'))
+
+    def _evict(self):
+        # Other workers write here too, so re-measure before deleting anything
+        entries = [e for e in os.scandir(self.root) if e.name.endswith('.jpg')]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._approx_bytes = total
+        if removed:
+            logging.info(f"Evicted {removed} screenshots from {self.root}")
+
+
+screenshot_store = ScreenshotStore()
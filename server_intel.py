@@ -0,0 +1,164 @@
+import os
+import time
+import socket
+import ipaddress
+import ssl
+import asyncio
+import logging
+import threading
+from urllib.parse import urlparse
+from http_client import session
+from metrics import stage_errors
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+# Per-host lookup caching
+DNS_TTL = int(os.environ.get('DNS_CACHE_TTL', 300))
+GEO_TTL = int(os.environ.get('GEO_CACHE_TTL', 86400))
+TLS_TTL = int(os.environ.get('TLS_CACHE_TTL', 3600))
+# Optional offline GeoIP databases (MaxMind/DB-IP .mmdb); ip-api.com is used otherwise
+GEOIP_DB = os.environ.get('GEOIP_DB')
+GEOIP_ASN_DB = os.environ.get('GEOIP_ASN_DB')
+
+
+class TTLCache:
+    """Small thread-safe dict whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                return entry[1]
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.time()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (time.time() + self.ttl, value)
+
+
+_dns_cache = TTLCache(DNS_TTL)
+_geo_cache = TTLCache(GEO_TTL)
+_tls_cache = TTLCache(TLS_TTL)
+
+
+def _cached(cache, key, lookup):
+    value = cache.get(key)
+    if value is None:
+        value = lookup()
+        cache.set(key, value)
+    return value
+
+
+class _MMDBGeo:
+    """Offline lookups against local .mmdb files."""
+
+    def __init__(self, path, asn_path=None):
+        self._reader = maxminddb.open_database(path)
+        self._asn_reader = maxminddb.open_database(asn_path) if asn_path else None
+
+    def lookup(self, ip_addr):
+        record = self._reader.get(ip_addr) or {}
+        country = record.get('country', {}).get('names', {}).get('en', 'Unknown')
+        org = 'Unknown'
+        if self._asn_reader:
+            asn = self._asn_reader.get(ip_addr) or {}
+            org = asn.get('autonomous_system_organization', 'Unknown')
+        return f"{country} - {org}"
+
+
+class _IPAPIGeo:
+    """Remote lookups against ip-api.com over the pooled session."""
+
+    def lookup(self, ip_addr):
+        r = session.get(f"http://ip-api.com/json/{ip_addr}?fields=country,isp,org", timeout=3)
+        r.raise_for_status()
+        d = r.json()
+        return f"{d.get('country', 'Unknown')} - {d.get('isp', 'Unknown')}"
+
+
+def _make_geo_provider():
+    if GEOIP_DB:
+        if maxminddb is None:
+            logging.warning("GEOIP_DB is set but maxminddb is not installed; using ip-api.com")
+        else:
+            logging.info(f"Using offline GeoIP database {GEOIP_DB}")
+            return _MMDBGeo(GEOIP_DB, GEOIP_ASN_DB)
+    return _IPAPIGeo()
+
+
+geo_provider = _make_geo_provider()
+
+
+def resolve_host(domain):
+    return _cached(_dns_cache, domain, lambda: socket.gethostbyname(domain))
+
+
+def geo_lookup(ip_addr):
+    if not ipaddress.ip_address(ip_addr).is_global:
+        # Nothing to look up for loopback/LAN targets, and no reason to leave the host
+        return "Private Network"
+    try:
+        return _cached(_geo_cache, ip_addr, lambda: geo_provider.lookup(ip_addr))
+    except Exception:
+        # Failures are not cached so the next scan retries
+        return "Unknown"
+
+
+def _fetch_certificate(domain):
+    ctx = ssl.create_default_context()
+    with socket.create_connection((domain, 443), timeout=3) as sock:
+        with ctx.wrap_socket(sock, server_hostname=domain) as ssock:
+            cert = ssock.getpeercert()
+            subject = dict(x[0] for x in cert['subject'])
+            issuer = dict(x[0] for x in cert['issuer'])
+            not_after = cert['notAfter']
+            return {
+                'issuer': issuer.get('organizationName', 'Unknown Issuer'),
+                'subject': subject.get('commonName', domain),
+                'expiry': not_after
+            }
+
+
+def certificate_info(domain):
+    try:
+        return _cached(_tls_cache, domain, lambda: _fetch_certificate(domain))
+    except Exception as e:
+        # Failures are not cached so the next scan retries
+        return f"SSL Error: {str(e)[:50]}"
+
+
+async def get_server_info(final_url):
+    """Collect IP, geo and TLS details for the host of ``final_url``."""
+    try:
+        domain = urlparse(final_url).netloc
+        if ':' in domain: domain = domain.split(':')[0]
+
+        # The TLS handshake only needs the hostname, so it runs alongside DNS + geo
+        ssl_task = None
+        if final_url.startswith('https'):
+            ssl_task = asyncio.ensure_future(asyncio.to_thread(certificate_info, domain))
+
+        ip_addr = await asyncio.to_thread(resolve_host, domain)
+        geo_info = await asyncio.to_thread(geo_lookup, ip_addr)
+        ssl_info = await ssl_task if ssl_task else "No SSL"
+
+        return {'ip': ip_addr, 'location': geo_info, 'ssl': ssl_info}
+
+    except Exception as e:
+        logging.error(f"Server info error: {e}")
+        stage_errors.inc('server_intel')
+        return {'error': str(e)}
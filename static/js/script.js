@@ -83,7 +83,11 @@ function displayResults(data, originalInput) {
     const imgEl = document.getElementById('siteScreenshot');
     const noShot = document.getElementById('noScreenshot');
 
-    if (data.security_scan && data.security_scan.screenshot) {
+    if (data.security_scan && data.security_scan.screenshot_url) {
+        imgEl.src = data.security_scan.screenshot_url;
+        imgEl.classList.remove('hidden');
+        noShot.classList.add('hidden');
+    } else if (data.security_scan && data.security_scan.screenshot) {
         imgEl.src = 'data:image/jpeg;base64,' + data.security_scan.screenshot;
         imgEl.classList.remove('hidden');
         noShot.classList.add('hidden');
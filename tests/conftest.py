@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+# Modules read their configuration and open their stores at import time;
+# point them at throwaway files before any test imports them
+_tmp = tempfile.mkdtemp(prefix='redirect_detector_tests_')
+os.environ.update({
+    'SCAN_HISTORY_DB': os.path.join(_tmp, 'history.db'),
+    'SCAN_JOBS_DB': os.path.join(_tmp, 'jobs.db'),
+    'THREAT_INTEL_INDEX': os.path.join(_tmp, 'missing.idx'),
+    'SCREENSHOT_DIR': os.path.join(_tmp, 'screenshots'),
+})
+for name in ('SCAN_CACHE_PATH', 'METRICS_DIR', 'SCAN_ARTIFACTS_DIR', 'SCAN_RULES_PATH'):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,17 @@
+from batch import parse_url_lines, dedupe_urls
+
+
+def test_parse_url_lines_plain_and_ndjson():
+    lines = ['# header', '', 'example.com', b'https://bytes.test/', '"https://quoted.test/"',
+             '{"url": "https://object.test/"}', '{"other": 1}', '{broken']
+    assert parse_url_lines(lines) == ['example.com', 'https://bytes.test/', 'https://quoted.test/',
+                                      'https://object.test/']
+
+
+def test_dedupe_urls_on_normalized_form():
+    urls = ['example.com', 'http://EXAMPLE.com/', 'http://example.com/?utm_source=x', 'https://example.com/']
+    assert dedupe_urls(urls) == ['http://example.com', 'https://example.com/']
+
+
+def test_dedupe_urls_keeps_unparseable_urls_for_reporting():
+    assert dedupe_urls(['http://a:xx/', 'a.test', ' http://a:xx/ ']) == ['http://a:xx/', 'http://a.test']
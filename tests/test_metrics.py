@@ -0,0 +1,29 @@
+from metrics import Registry
+
+
+def test_render_counters_and_histograms():
+    registry = Registry()
+    scans = registry.counter('scans_total', 'Finished scans.', ['outcome'])
+    seconds = registry.histogram('scan_seconds', 'Scan time.', buckets=(1, 5))
+    scans.inc('ok')
+    scans.inc('ok')
+    scans.inc('failed')
+    seconds.observe(0.5)
+    seconds.observe(3)
+    seconds.observe(60)
+
+    lines = registry.render().splitlines()
+    assert '# TYPE scans_total counter' in lines
+    assert 'scans_total{outcome="ok"} 2.0' in lines
+    assert 'scans_total{outcome="failed"} 1.0' in lines
+    assert 'scan_seconds_bucket{le="1"} 1' in lines
+    assert 'scan_seconds_bucket{le="5"} 2' in lines
+    assert 'scan_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'scan_seconds_sum 63.5' in lines
+    assert 'scan_seconds_count 3' in lines
+
+
+def test_label_values_cannot_break_the_format():
+    registry = Registry()
+    registry.counter('c_total', 'Doc.', ['stage']).inc('a"b')
+    assert 'c_total{stage="ab"} 1.0' in registry.render().splitlines()
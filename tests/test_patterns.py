@@ -0,0 +1,61 @@
+import re
+from patterns import Matcher, Rules, STREAM_OVERLAP
+
+
+def test_matcher_finds_signatures_starting_inside_another_match():
+    matcher = Matcher([('k', 'pay', 'pay'), ('k', 'paypal', 'paypal')])
+    assert matcher.search('paypal-login') == {('k', 'pay'), ('k', 'paypal')}
+
+    matcher = Matcher([('k', 'eval', r'eval\('), ('k', 'val', 'val')])
+    assert matcher.search('x = eval(y)') == {('k', 'eval'), ('k', 'val')}
+
+
+def test_matcher_is_case_insensitive_and_empty_safe():
+    assert Matcher([('k', 'urgent', 'urgent')]).search('URGENT notice') == {('k', 'urgent')}
+    assert Matcher([]).search('anything') == set()
+
+
+def test_matcher_mixes_literal_and_regex_signatures():
+    matcher = Matcher([('k', 'mining', 'Crypto|miner'), ('k', 'digits', r'id=\d+'), ('k', 'dot', 'a.b')])
+    assert matcher.search('MINER id=42 axb') == {('k', 'mining'), ('k', 'digits'), ('k', 'dot')}
+    assert matcher.search('crypt id= a.') == set()
+
+
+def test_stream_keeps_matches_across_chunk_boundaries():
+    stream = Matcher([('urgency', 'action required', re.escape('action required'))]).stream()
+    stream.feed('x' * (STREAM_OVERLAP * 2) + 'action req')
+    stream.feed('uired now')
+    assert stream.names('urgency') == ['action required']
+
+
+def test_stream_kinds_filter_and_end():
+    matcher = Matcher([('pattern', 'eval', r'eval\('), ('urgency', 'urgent', 'urgent')])
+    stream = matcher.stream()
+    stream.feed('urgent eval(', kinds=('pattern',))
+    assert stream.names('pattern') == ['eval']
+    assert stream.names('urgency') == []
+    stream.end()
+    stream.feed('urg')
+    stream.end()
+    stream.feed('ent')
+    assert stream.names('urgency') == []
+
+
+def test_rules_helpers():
+    rules = Rules({
+        'url_keywords': ['login', 'verify'],
+        'risky_tlds': ['.xyz'],
+        'trusted_hosts': ['Google.com'],
+        'user_content_hosts': ['github.io'],
+    })
+    assert rules.url_keywords_in('http://a.xyz/verify/login') == ['login', 'verify']
+    assert rules.has_risky_tld('http://A.XYZ/')
+    assert rules.is_trusted_host('https://google.com/url?q=x')
+    assert not rules.is_trusted_host('https://sites.google.com/')
+    assert rules.serves_user_content('https://Someone.GitHub.io/login')
+    assert not rules.serves_user_content('https://notgithub.io/')
+
+
+def test_rules_version_tracks_content():
+    assert Rules({'urgency_words': ['a']}).version == Rules({'urgency_words': ['a']}).version
+    assert Rules({'urgency_words': ['a']}).version != Rules({'urgency_words': ['b']}).version
@@ -0,0 +1,27 @@
+from scan_cache import ScanCache, cache_variant, normalize_url
+
+
+def test_normalize_url_canonical_form():
+    assert normalize_url('HTTP://Example.COM:80/Path/?b=2&a=1#frag') == 'http://example.com/Path?a=1&b=2'
+    assert normalize_url('https://example.com:443') == 'https://example.com/'
+    assert normalize_url('https://example.com:8443/') == 'https://example.com:8443/'
+
+
+def test_normalize_url_drops_tracking_parameters():
+    url = 'https://example.com/a?utm_source=x&gclid=1&id=7&UTM_Medium=y'
+    assert normalize_url(url) == 'https://example.com/a?id=7'
+
+
+def test_cache_variant_separates_profile_and_skipped_stages():
+    variants = {cache_variant('fast', set()), cache_variant('faithful', set()),
+                cache_variant('fast', {'screenshot'})}
+    assert len(variants) == 3
+    assert cache_variant('fast', {'b', 'a'}) == cache_variant('fast', ['a', 'b'])
+
+
+def test_cache_hit_depends_on_variant():
+    cache = ScanCache(ttl=60, path=None)
+    cache.set('http://a.test/', {'final_url': 'http://a.test/'}, cache_variant('fast', set()))
+    assert cache.get('http://a.test', cache_variant('faithful', set())) is None
+    report, _ = cache.get('HTTP://A.TEST/', cache_variant('fast', set()))
+    assert report == {'final_url': 'http://a.test/'}
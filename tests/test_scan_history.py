@@ -0,0 +1,73 @@
+import time
+import pytest
+from scan_history import ScanHistory, can_reuse, compare_scans
+
+
+def _triage(url='http://a.test/', status=200, content_hash='h1', headers=None):
+    return {'hops': [{'url': url, 'status': status}], 'status': status, 'headers': headers or {},
+            'content_hash': content_hash}
+
+
+def _report(verdict='Safe', patterns=()):
+    return {'final_url': 'http://a.test/', 'redirect_chain': [{'url': 'http://a.test/'}],
+            'security_scan': {'verdict': verdict, 'suspicious_patterns': list(patterns), 'headers': {}},
+            'simple_analysis': {'phishing_score': 0}}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ScanHistory(str(tmp_path / 'history.db'))
+
+
+@pytest.fixture
+def previous(history):
+    history.record('http://a.test/', _report(), _triage(headers={'etag': '"v1"'}), 'fast', set(), time.time(), 'r1')
+    return history.latest('http://a.test/')
+
+
+def test_reuse_when_page_and_rules_unchanged(previous):
+    assert previous['etag'] == '"v1"'
+    assert can_reuse(previous, _triage(), 'fast', set(), 'r1')
+    assert can_reuse(previous, _triage(status=304, content_hash=None), 'fast', set(), 'r1')
+    assert can_reuse(previous, _triage(), 'fast', {'screenshot'}, 'r1')
+
+
+@pytest.mark.parametrize('triage, profile, skip, rules_version', [
+    (_triage(content_hash='h2'), 'fast', set(), 'r1'),
+    (_triage(content_hash=None), 'fast', set(), 'r1'),
+    (_triage(url='http://b.test/'), 'fast', set(), 'r1'),
+    (_triage(), 'faithful', set(), 'r1'),
+    (_triage(), 'fast', set(), 'r2'),
+    (None, 'fast', set(), 'r1'),
+])
+def test_no_reuse_when_anything_changed(previous, triage, profile, skip, rules_version):
+    assert not can_reuse(previous, triage, profile, skip, rules_version)
+
+
+def test_no_reuse_when_last_scan_skipped_a_needed_stage(history):
+    history.record('http://a.test/', _report(), _triage(), 'fast', {'deep_links'}, time.time(), 'r1')
+    assert not can_reuse(history.latest('http://a.test/'), _triage(), 'fast', set(), 'r1')
+
+
+def test_not_modified_keeps_last_validators(history, previous):
+    history.record('http://a.test/', _report(), _triage(status=304, content_hash=None), 'fast', set(),
+                   previous['rendered_at'], 'r1', previous)
+    latest = history.latest('http://a.test/')
+    assert latest['etag'] == '"v1"'
+    assert latest['content_hash'] == 'h1'
+
+
+def test_compare_scans_lists_changes(previous):
+    assert compare_scans(None, _report()) == {'previous_scan': None, 'changes': []}
+    diff = compare_scans(previous, _report('Suspicious', ['eval']), _triage(content_hash='h2'))
+    fields = {change['field']: change for change in diff['changes']}
+    assert set(fields) == {'verdict', 'suspicious_patterns', 'content'}
+    assert fields['verdict']['before'] == 'Safe' and fields['verdict']['after'] == 'Suspicious'
+
+
+def test_old_scans_are_pruned_for_every_url(history, monkeypatch):
+    history.record('http://old.test/', _report(), _triage(), 'fast', set(), time.time(), 'r1')
+    monkeypatch.setattr('scan_history.HISTORY_RETENTION', -1)
+    history.record('http://a.test/', _report(), _triage(), 'fast', set(), time.time(), 'r1')
+    assert history.latest('http://old.test/') is None
+    assert history.latest('http://a.test/') is not None
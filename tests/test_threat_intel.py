@@ -0,0 +1,39 @@
+import pytest
+from threat_intel import ThreatIndex, build_index, registrable_domain
+
+
+@pytest.fixture
+def index(tmp_path):
+    plain = tmp_path / 'openphish.txt'
+    plain.write_text('# comment\nhttps://phish.test/login?x=1,2\nbad.example\n')
+    urlhaus = tmp_path / 'urlhaus.csv'
+    urlhaus.write_text('# id,dateadded,url,url_status,last_online,threat,tags\n'
+                       '"1","2024-01-01","http://mal.test/a,b","online","","malware_download","elf"\n')
+    path = tmp_path / 'threat_intel.idx'
+    assert build_index([str(plain), str(urlhaus)], str(path)) == 3
+    return ThreatIndex(str(path))
+
+
+def test_registrable_domain():
+    assert registrable_domain('a.b.example.com') == 'example.com'
+    assert registrable_domain('a.b.co.uk') == 'b.co.uk'
+
+
+def test_plain_list_urls_keep_commas(index):
+    assert index.lookup('https://phish.test/login?x=1,2') == ('url', 'openphish')
+    assert index.lookup('https://phish.test/login?x=1') is None
+
+
+def test_urlhaus_csv_tags(index):
+    assert index.lookup('http://mal.test/a,b') == ('url', 'malware_download')
+
+
+def test_hosts_cover_subdomains(index):
+    assert index.lookup('http://bad.example/x') == ('host', 'openphish')
+    assert index.lookup('http://www.bad.example/x') == ('domain', 'openphish')
+    assert index.lookup('https://phish.test/', hosts_only=True) is None
+    assert index.lookup('https://clean.test/') is None
+
+
+def test_missing_index_disables_lookups(tmp_path):
+    assert ThreatIndex(str(tmp_path / 'none.idx')).lookup('http://bad.example/') is None
@@ -0,0 +1,34 @@
+import pytest
+from bench_fixtures import TRUSTED_HOST, start_fixture_server
+from triage import triage_url
+
+
+@pytest.fixture(scope='module')
+def site():
+    server, base_url = start_fixture_server()
+    yield base_url, server.server_address[1]
+    server.shutdown()
+
+
+def test_real_status_per_hop(site):
+    base_url, _ = site
+    triage = triage_url(base_url + '/chain/3', mode='auto')
+    assert [hop['status'] for hop in triage['hops']] == [308, 307, 302, 301, 200]
+    assert triage['render'] and triage['reason'] == 'html'
+
+
+def test_downloads_skip_the_browser(site):
+    base_url, _ = site
+    triage = triage_url(base_url + '/download', mode='auto')
+    assert triage['final_url'].endswith('/files/report.pdf')
+    assert not triage['render'] and triage['reason'] == 'not_html'
+
+
+def test_trusted_host_open_redirect_is_rendered(site):
+    base_url, port = site
+    trusted = lambda url: url.startswith(f'http://{TRUSTED_HOST}:{port}/')
+    assert triage_url(base_url + '/open-redirect', trusted, mode='auto')['render']
+    for path in ('/js-redirect', '/meta-refresh'):
+        assert triage_url(f'http://{TRUSTED_HOST}:{port}{path}', trusted, mode='auto')['render']
+    plain = triage_url(f'http://{TRUSTED_HOST}:{port}/landing', trusted, mode='auto')
+    assert not plain['render'] and plain['reason'] == 'trusted_host'
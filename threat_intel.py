@@ -0,0 +1,277 @@
+"""Local threat-intel index built from URL/host blocklist feeds.
+
+Build or refresh the index (atomically replaced, picked up by running workers):
+    python threat_intel.py build -o threat_intel.idx urlhaus.csv openphish.txt
+
+Index layout (native-endian, memory-mapped read-only by every worker):
+    header | bloom filter bits | sorted uint64 key hashes | uint16 tag ids | JSON tag table
+"""
+import os
+import csv
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import itertools
+import argparse
+import threading
+from array import array
+from urllib.parse import urlsplit
+from scan_cache import normalize_url
+
+THREAT_INTEL_INDEX = os.environ.get('THREAT_INTEL_INDEX', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'threat_intel.idx'))
+
+MAGIC = b'RDTI0001'
+HEADER = struct.Struct('=8sQQQ')  # magic, entries, bloom bits, bloom hash count
+BLOOM_BITS_PER_ENTRY = 10
+BLOOM_HASHES = 7
+
+# Second-level labels under which registrations happen one level deeper
+MULTI_PART_SUFFIXES = {'co', 'com', 'net', 'org', 'gov', 'edu', 'ac', 'or', 'ne', 'go'}
+
+
+def registrable_domain(host):
+    """Best-effort eTLD+1 without a public suffix list (``a.b.co.uk`` -> ``b.co.uk``)."""
+    labels = host.strip('.').split('.')
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _bloom_positions(h, bits):
+    h1, h2 = h & 0xffffffff, h >> 32
+    return [(h1 + i * h2) % bits for i in range(BLOOM_HASHES)]
+
+
+def lookup_keys(url):
+    """Index keys a URL can match: the exact URL, its host, its registrable domain."""
+    host = (urlsplit(url).hostname or '').lower()
+    keys = [('url', 'u:' + normalize_url(url))]
+    if host:
+        keys.append(('host', 'h:' + host))
+        domain = registrable_domain(host)
+        if domain != host:
+            keys.append(('domain', 'h:' + domain))
+    return keys
+
+
+# --- Building ---
+
+def _is_csv(path, first_line):
+    # URLhaus exports quote every field; plain lists are one URL or host per line
+    return path.lower().endswith('.csv') or first_line.lstrip().startswith('"')
+
+
+def _feed_entries(path):
+    """Yield ``(key, tag)`` pairs from a URLhaus-style CSV or a plain URL/host list."""
+    source = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding='utf-8', errors='replace') as f:
+        lines = (line for line in f if line.strip() and not line.startswith('#'))
+        first = next(lines, None)
+        if first is None:
+            return
+        lines = itertools.chain([first], lines)
+        if _is_csv(path, first):
+            for row in csv.reader(lines):
+                url = next((field.strip() for field in row if field.strip().startswith(('http://', 'https://'))), None)
+                if url:
+                    # URLhaus: id,dateadded,url,url_status,last_online,threat,tags,...
+                    tag = row[5].strip() if len(row) > 6 and row[5].strip() else source
+                    yield 'u:' + normalize_url(url), tag
+            return
+
+        for line in lines:
+            # Whole lines: URLs may contain commas
+            entry = line.strip()
+            if entry.startswith(('http://', 'https://')):
+                yield 'u:' + normalize_url(entry), source
+            elif '/' not in entry and not any(c.isspace() for c in entry):
+                # Bare hostnames list the whole host
+                yield 'h:' + entry.lower().strip('.'), source
+
+
+def build_index(feed_paths, output):
+    entries = {}
+    for path in feed_paths:
+        for key, tag in _feed_entries(path):
+            entries.setdefault(_hash(key), tag)
+
+    tags = sorted(set(entries.values()))
+    tag_ids = {tag: i for i, tag in enumerate(tags)}
+    hashes = array('Q', sorted(entries))
+    tag_column = array('H', (tag_ids[entries[h]] for h in hashes))
+
+    bloom_bits = max(64, len(hashes) * BLOOM_BITS_PER_ENTRY)
+    bloom = bytearray((bloom_bits + 7) // 8)
+    for h in hashes:
+        for pos in _bloom_positions(h, bloom_bits):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+
+    # Keep the hash array 8-byte aligned for the zero-copy memoryview cast
+    padding = (-(HEADER.size + len(bloom))) % 8
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(hashes), bloom_bits, BLOOM_HASHES))
+        f.write(bloom)
+        f.write(b'\0' * padding)
+        f.write(hashes.tobytes())
+        f.write(tag_column.tobytes())
+        f.write(json.dumps(tags).encode('utf-8'))
+    # Atomic swap: readers see either the old or the new index, never a partial one
+    os.replace(tmp, output)
+    return len(hashes)
+
+
+# --- Lookups ---
+
+class ThreatIndex:
+    """Read-only view of an index file, reopened when the file is replaced."""
+
+    def __init__(self, path=THREAT_INTEL_INDEX):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._view = None
+        self._missing_logged = False
+
+    def _open(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if not self._missing_logged:
+                logging.warning(f"Threat intel index {self.path} not found; blacklist checks disabled")
+                self._missing_logged = True
+            self._identity, self._view = None, None
+            return None
+
+        identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if identity == self._identity:
+            return self._view
+
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, bloom_bits, _ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a threat intel index")
+
+        bloom_start = HEADER.size
+        hashes_start = bloom_start + (bloom_bits + 7) // 8
+        hashes_start += (-hashes_start) % 8
+        tags_start = hashes_start + count * 8
+        table_start = tags_start + count * 2
+        view = {
+            'mmap': mm,
+            'count': count,
+            'bloom_bits': bloom_bits,
+            'bloom_start': bloom_start,
+            'hashes': memoryview(mm)[hashes_start:tags_start].cast('Q'),
+            'tag_ids': memoryview(mm)[tags_start:table_start].cast('H'),
+            'tags': json.loads(bytes(mm[table_start:]).decode('utf-8'))
+        }
+        logging.info(f"Loaded threat intel index ({count} entries)")
+        self._identity, self._view = identity, view
+        return view
+
+    def _find(self, view, key):
+        h = _hash(key)
+        mm, start = view['mmap'], view['bloom_start']
+        for pos in _bloom_positions(h, view['bloom_bits']):
+            if not mm[start + (pos >> 3)] & (1 << (pos & 7)):
+                return None
+
+        hashes = view['hashes']
+        lo, hi = 0, view['count']
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if hashes[mid] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < view['count'] and hashes[lo] == h:
+            return view['tags'][view['tag_ids'][lo]]
+        return None
+
+    def lookup(self, url, hosts_only=False):
+        """Return ``(match_type, tag)`` for the first listed key of ``url``, else ``None``.
+
+        With ``hosts_only`` the exact-URL key is not checked, so a hit means the
+        whole host (or registrable domain) is listed.
+        """
+        with self._lock:
+            try:
+                view = self._open()
+            except (OSError, ValueError) as e:
+                logging.error(f"Threat intel index error: {e}")
+                return None
+        if view is None:
+            return None
+        for match_type, key in lookup_keys(url):
+            if hosts_only and match_type == 'url':
+                continue
+            tag = self._find(view, key)
+            if tag is not None:
+                return match_type, tag
+        return None
+
+
+index = ThreatIndex()
+
+
+def check_threat_intel(final_url, redirect_chain=(), deep_links=()):
+    """Check the final URL, every redirect hop and every deep-link target."""
+    matches = []
+    checked = set()
+
+    def check(url, where):
+        if not url or url in checked:
+            return
+        checked.add(url)
+        hit = index.lookup(url)
+        if hit:
+            matches.append({'url': url, 'where': where, 'match': hit[0], 'tag': hit[1]})
+
+    check(final_url, 'final_url')
+    for hop in redirect_chain:
+        check(hop.get('url'), 'redirect_chain')
+    for link in deep_links:
+        check(link.get('final_url'), 'deep_link')
+
+    # The page itself is malicious if the user is sent through a listed URL
+    on_path = [m for m in matches if m['where'] != 'deep_link']
+    return {
+        'malicious': bool(on_path),
+        'tags': sorted({m['tag'] for m in on_path}),
+        'matches': matches
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the local threat intel index.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='build the index from feed files')
+    build.add_argument('feeds', nargs='+', help='URLhaus/OpenPhish-style CSV or text lists')
+    build.add_argument('-o', '--output', default=THREAT_INTEL_INDEX)
+    check = sub.add_parser('check', help='look up URLs in the index')
+    check.add_argument('urls', nargs='+')
+    check.add_argument('-i', '--index', default=THREAT_INTEL_INDEX)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_index(args.feeds, args.output)
+        print(f"Indexed {count} entries into {args.output}")
+    else:
+        lookup_index = ThreatIndex(args.index)
+        for url in args.urls:
+            print(url, lookup_index.lookup(url) or 'not listed')
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
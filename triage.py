@@ -0,0 +1,162 @@
+import os
+import time
+import re
+import hashlib
+import logging
+from urllib.parse import urljoin
+from http_client import session
+from metrics import stage_errors, stage_timeouts, is_timeout
+
+# 'auto' skips the browser when the HTTP answer is conclusive, 'hops' only
+# records real redirect status codes, 'off' disables the pre-stage
+TRIAGE_MODE = os.environ.get('TRIAGE_MODE', 'auto')
+TRIAGE_TIMEOUT = float(os.environ.get('TRIAGE_TIMEOUT', 5))
+TRIAGE_MAX_HOPS = int(os.environ.get('TRIAGE_MAX_HOPS', 10))
+
+# Bytes of the final body hashed to tell whether the page changed since the last scan
+TRIAGE_HASH_MAX_BYTES = int(os.environ.get('TRIAGE_HASH_MAX_BYTES', 4 * 1024 * 1024))
+
+# Bytes of the final body read to sniff its type and feed the content scan
+SNIFF_BYTES = 16 * 1024
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+HTML_MARKERS = (b'<!doctype html', b'<html', b'<head', b'<body', b'<script', b'<meta', b'<iframe')
+# Meta refreshes and script navigations: a trusted host serving one may be an open redirect
+CLIENT_REDIRECT = re.compile(rb'http-equiv\s*=\s*["\']?refresh|\blocation\s*(?:\.\s*(?:href|replace|assign)\b|=[^=])'
+                             rb'|window\.open\s*\(', re.IGNORECASE)
+# Bytes carried between chunks so a marker split across them is still seen
+REDIRECT_OVERLAP = 64
+
+
+def _looks_like_html(content_type, head):
+    if content_type.split(';')[0].strip().lower() in HTML_TYPES:
+        return True
+    # Servers mislabel pages (or send none); a browser would still render markup
+    if not content_type or content_type.startswith(('text/plain', 'application/octet-stream')):
+        start = head[:1024].lstrip().lower()
+        return any(marker in start for marker in HTML_MARKERS)
+    return False
+
+
+def follow_redirects(url, max_hops=TRIAGE_MAX_HOPS, conditional=None):
+    """Follow server-side redirects one hop at a time (blocking).
+
+    Returns ``(hops, response)``: every hop with its real status code, ending
+    with the final document, and that document's open streamed response.
+    ``conditional`` maps a URL to validator headers (``If-None-Match``...)
+    sent when that hop is requested.
+    """
+    hops = []
+    conditional = conditional or {}
+    for _ in range(max_hops + 1):
+        r = session.get(url, allow_redirects=False, timeout=TRIAGE_TIMEOUT, verify=False, stream=True,
+                        headers=conditional.get(url))
+        hops.append({'url': r.url, 'status': r.status_code})
+        location = r.headers.get('location')
+        if not (r.is_redirect and location):
+            return hops, r
+        r.close()
+        url = urljoin(r.url, location)
+    return hops, None
+
+
+def _read_body(response):
+    """First SNIFF_BYTES of the body, a hash of all of it and whether it redirects client-side.
+
+    Past TRIAGE_HASH_MAX_BYTES the hash is ``None`` and the unread rest is
+    assumed to redirect.
+    """
+    head = b''
+    tail = b''
+    redirects = False
+    digest = hashlib.sha256()
+    read = 0
+    for chunk in response.iter_content(64 * 1024):
+        if len(head) < SNIFF_BYTES:
+            head += chunk[:SNIFF_BYTES - len(head)]
+        read += len(chunk)
+        if read > TRIAGE_HASH_MAX_BYTES:
+            return head, None, True
+        digest.update(chunk)
+        redirects = redirects or bool(CLIENT_REDIRECT.search(tail + chunk))
+        tail = chunk[-REDIRECT_OVERLAP:]
+    return head, digest.hexdigest(), redirects
+
+
+def _validators(previous):
+    # Ask the server whether the document from the last scan is still current
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+    return {previous['final_url']: headers} if headers else None
+
+
+def triage_url(url, trusted_host=lambda url: False, mode=TRIAGE_MODE, previous=None):
+    """Resolve ``url`` over plain HTTP and decide whether it needs a browser.
+
+    Returns ``None`` when the pre-stage is off or fails (the browser handles
+    the URL as before), otherwise a dict with the hops, the final response's
+    status, headers, sniffed body and content hash, and ``render``/``reason``.
+    ``previous`` is the last scan's HTTP fingerprint (see scan_history); its
+    validators make the final request conditional.
+    """
+    if mode == 'off':
+        return None
+
+    started = time.monotonic()
+    try:
+        hops, response = follow_redirects(url, conditional=_validators(previous) if previous else None)
+        if response is None:
+            content_type, head, headers, content_hash, redirects = '', b'', {}, None, True
+        else:
+            try:
+                content_type = response.headers.get('content-type', '')
+                headers = dict(response.headers)
+                head, content_hash, redirects = _read_body(response)
+            finally:
+                response.close()
+    except Exception as e:
+        logging.info(f"Pre-triage failed for {url}, rendering instead: {e}")
+        (stage_timeouts if is_timeout(e) else stage_errors).inc('triage')
+        return None
+
+    final = hops[-1]
+    is_html = _looks_like_html(content_type, head)
+    if mode != 'auto':
+        render, reason = True, 'mode'
+    elif response is None:
+        render, reason = True, 'too_many_hops'
+    elif final['status'] == 304:
+        # Unchanged since the last scan; the caller decides whether that scan can be reused
+        render, reason, content_hash = True, 'not_modified', None
+    elif final['status'] >= 400:
+        # Bot walls and geo blocks often answer plain clients differently
+        render, reason = True, 'http_error'
+    elif not is_html:
+        render, reason = False, 'not_html'
+    elif trusted_host(final['url']) and not redirects:
+        # Trusted hosts still run open redirects (google.com/url?q=...); those get the browser
+        render, reason = False, 'trusted_host'
+    else:
+        render, reason = True, 'html'
+
+    return {
+        'hops': hops,
+        'final_url': final['url'],
+        'status': final['status'],
+        'content_type': content_type,
+        'headers': {k.lower(): v for k, v in headers.items()},
+        'body': head.decode('utf-8', errors='replace') if is_html else '',
+        'content_hash': content_hash,
+        'render': render,
+        'reason': reason,
+        'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+    }
+
+
+def hop_statuses(triage):
+    """URL -> status for the redirect hops seen over HTTP, to label browser hops."""
+    if not triage:
+        return {}
+    return {hop['url']: hop['status'] for hop in triage['hops'][:-1]}
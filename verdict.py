@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import wait
+from urllib.parse import urlsplit
+from scan_engine import SCAN_TIMEOUT
+from scan_cache import cache, cache_variant
+from scanner import prepare_url
+from jobs import submit_scan
+from patterns import get_rules
+from threat_intel import index, registrable_domain
+from resource_policy import SCAN_PROFILE
+from metrics import stage_timeouts
+
+# Bumped whenever the compact payload changes shape
+VERDICT_VERSION = 1
+# Stages the compact verdict never reads
+VERDICT_SKIP = frozenset({'screenshot', 'deep_links', 'server_info'})
+VERDICT_MAX_URLS = int(os.environ.get('VERDICT_MAX_URLS', 50))
+# Client-side caching of verdicts and host hints
+VERDICT_MAX_AGE = int(os.environ.get('VERDICT_MAX_AGE', 300))
+HOST_HINT_MAX_AGE = int(os.environ.get('HOST_HINT_MAX_AGE', 86400))
+
+
+def host_hint(url):
+    """Verdict that holds for every URL on the host, or ``None``.
+
+    ``block`` when the host or its registrable domain is blacklisted, ``allow``
+    for hosts in the rules' ``trusted_hosts``. Clients may cache a hint for its
+    ``max_age`` and skip lookups for that ``scope``, so ``allow`` is never given
+    for a listed URL or a host in ``user_content_hosts``.
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    if not host:
+        return None
+    listed = index.lookup(url, hosts_only=True)
+    if listed:
+        scope = registrable_domain(host) if listed[0] == 'domain' else host
+        return {'scope': scope, 'verdict': 'block', 'tag': listed[1], 'max_age': HOST_HINT_MAX_AGE}
+    rules = get_rules()
+    if rules.is_trusted_host(url) and not rules.serves_user_content(url) and not index.lookup(url):
+        return {'scope': host, 'verdict': 'allow', 'max_age': HOST_HINT_MAX_AGE}
+    return None
+
+
+def compact_verdict(url, report, hint=None):
+    """The score-and-reasons subset of a full report."""
+    security = report['security_scan']
+    simple = report['simple_analysis']
+    if hint and hint['verdict'] == 'allow' and security['threat_intel']['malicious']:
+        # Something on the redirect chain is listed; the host must keep being checked
+        hint = None
+    return {
+        'v': VERDICT_VERSION,
+        'url': url,
+        'final_url': report['final_url'],
+        'verdict': security['verdict'],
+        'risk_score': security['risk_score'],
+        'phishing_score': simple['phishing_score'],
+        'phishing_verdict': simple['phishing_verdict'],
+        'malicious': security['threat_intel']['malicious'],
+        'redirects': max(0, len(report['redirect_chain']) - 1),
+        'reasons': simple['summary'],
+        'host_hint': hint
+    }
+
+
+def _blocked_verdict(url, hint):
+    # A listed host needs no scan to be called out
+    return {
+        'v': VERDICT_VERSION,
+        'url': url,
+        'final_url': url,
+        'verdict': 'CRITICAL THREAT',
+        'risk_score': 0,
+        'phishing_score': 100,
+        'phishing_verdict': 'High',
+        'malicious': True,
+        'redirects': 0,
+        'reasons': [f"⛔ CRITICAL: {hint['scope']} is in the Global Blacklist. Tags: {hint['tag']}"],
+        'host_hint': hint
+    }
+
+
+def get_verdicts(urls, use_cache=True, profile=SCAN_PROFILE):
+    """Compact verdicts for ``urls``, in order; failed lookups carry an ``error``.
+
+    Cache misses are scanned concurrently (without the stages in VERDICT_SKIP)
+    and waited on together for at most SCAN_TIMEOUT.
+    """
+    variant = cache_variant(profile, VERDICT_SKIP)
+    results = [None] * len(urls)
+    pending = {}
+
+    for i, raw_url in enumerate(urls):
+        url = prepare_url(raw_url)
+        hint = host_hint(url)
+        if hint and hint['verdict'] == 'block':
+            results[i] = _blocked_verdict(url, hint)
+            continue
+        cached = cache.get(url, variant) if use_cache else None
+        if cached:
+            results[i] = compact_verdict(url, cached[0], hint)
+            continue
+        _, future = submit_scan(url, use_cache=False, profile=profile, skip=VERDICT_SKIP)
+        pending[future] = (i, url, hint)
+
+    if pending:
+        wait(list(pending), timeout=SCAN_TIMEOUT)
+    for future, (i, url, hint) in pending.items():
+        if not future.done():
+            future.cancel()
+            stage_timeouts.inc('scan')
+            results[i] = {'v': VERDICT_VERSION, 'url': url, 'error': 'Scan timed out'}
+            continue
+        try:
+            results[i] = compact_verdict(url, future.result(), hint)
+        except Exception as e:
+            logging.error(f"Verdict scan error for {url}: {e}")
+            results[i] = {'v': VERDICT_VERSION, 'url': url, 'error': str(e)}
+    return results
+
+
+def etag_for(payload):
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()